@@ -1,6 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from db.database import SessionLocal
+from db.database import SessionLocal, get_async_session_factory
 import os
 
 
@@ -12,6 +13,12 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async session for read-heavy endpoints that should not hold a threadpool thread."""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
 def get_stripe_key():
     return os.getenv("STRIPE_SECRET_KEY")
 
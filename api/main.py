@@ -1,6 +1,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .routers_projects import router as projects_router
 from .routers_agents import router as agents_router
@@ -8,9 +9,14 @@ from .routers_tasks import router as tasks_router
 from .routers_executions import router as executions_router
 from .routers_settings import router as settings_router
 from .routers_import_export import router as import_export_router
-from .routers_auth import router as auth_router
+from .routers_auth import router as auth_router, shutdown_hash_pool
 from .routers_billing import router as billing_router
+from .routers_stats import router as stats_router
+from .routers_search import router as search_router
+from .utils_http import CompressionMiddleware
+from .utils_import import shutdown_parse_pool
 from db.seed import init_db
+from src.executor import lease_keeper
 
 
 def create_app() -> FastAPI:
@@ -18,6 +24,7 @@ def create_app() -> FastAPI:
         title="Crew AI Studio API",
         version="1.0.0",
         description="API para projetos, agentes, tasks, execuções, importação/exportação e integrações",
+        default_response_class=ORJSONResponse,
     )
 
     # CORS
@@ -29,6 +36,8 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # gzip/brotli for large JSON payloads (execution logs, project lists)
+    app.add_middleware(CompressionMiddleware)
 
     # Ensure database tables exist
     @app.on_event("startup")
@@ -38,6 +47,14 @@ def create_app() -> FastAPI:
         except Exception:
             # On start errors should not crash the app in dev; logs will be visible in console
             pass
+        # Renews this process's execution leases and fails runs whose process stopped
+        lease_keeper.start()
+
+    @app.on_event("shutdown")
+    def _shutdown_pools():
+        lease_keeper.stop()
+        shutdown_hash_pool()
+        shutdown_parse_pool()
 
     @app.get("/health")
     def health():
@@ -51,6 +68,8 @@ def create_app() -> FastAPI:
     app.include_router(import_export_router)
     app.include_router(auth_router)
     app.include_router(billing_router)
+    app.include_router(stats_router)
+    app.include_router(search_router)
 
     # AI Builder (prompt-to-flow)
     try:
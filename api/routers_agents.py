@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from db import models
-from .schemas import AgentBase, AgentRead, AgentUpdate
-from .deps import get_db
+from db.bulk import insert_returning_ids
+from .schemas import AgentBase, AgentRead, AgentUpdate, AgentBatchRequest, AgentBatchResult
+from .deps import get_db, get_async_db
+from .utils_http import rows_response, schema_columns
 
 
 router = APIRouter(tags=["agents"]) 
 
 
 @router.get("/projects/{project_id}/agents", response_model=List[AgentRead])
-def list_agents(project_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Agent).filter_by(project_id=project_id).all()
+async def list_agents(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    q = select(*schema_columns(models.Agent, AgentRead)).filter_by(project_id=project_id)
+    return rows_response((await db.execute(q)).mappings())
 
 
 @router.post("/projects/{project_id}/agents", response_model=AgentRead, status_code=201)
@@ -59,3 +64,71 @@ def delete_agent(agent_id: int, db: Session = Depends(get_db)):
     db.delete(agent)
     db.commit()
     return None
+
+
+@router.post("/projects/{project_id}/agents:batch", response_model=AgentBatchResult)
+def batch_agents(project_id: int, payload: AgentBatchRequest, db: Session = Depends(get_db)):
+    """Create, update and delete agents of a project in a single transaction."""
+    if not db.query(models.Project.id).filter_by(id=project_id).first():
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    update_ids = [u.id for u in payload.update]
+    delete_ids = list(dict.fromkeys(payload.delete))
+    if len(set(update_ids)) != len(update_ids) or set(update_ids) & set(delete_ids):
+        raise HTTPException(status_code=400, detail="Each agent id may appear only once per batch")
+
+    touched = set(update_ids) | set(delete_ids)
+    if touched:
+        found = set(db.scalars(
+            select(models.Agent.id).where(models.Agent.project_id == project_id, models.Agent.id.in_(touched))
+        ))
+        missing = sorted(touched - found)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Agents not found in this project: {missing}")
+    if delete_ids:
+        # One grouped query instead of a count per agent
+        blocked = sorted(db.scalars(
+            select(models.Task.agent_id).where(models.Task.agent_id.in_(delete_ids)).distinct()
+        ))
+        if blocked:
+            raise HTTPException(status_code=400, detail=f"Agents have tasks; delete tasks first: {blocked}")
+
+    result = AgentBatchResult()
+    if payload.create:
+        rows = [
+            {
+                "project_id": project_id,
+                "name": a.name,
+                "role": a.role,
+                "goal": a.goal,
+                "backstory": a.backstory,
+                "tools": a.tools or [],
+                "verbose": bool(a.verbose),
+                "memory": bool(a.memory),
+                "allow_delegation": bool(a.allow_delegation),
+            }
+            for a in payload.create
+        ]
+        ids = insert_returning_ids(db, models.Agent, rows)
+        created = db.scalars(select(models.Agent).where(models.Agent.id.in_(ids)).order_by(models.Agent.id))
+        result.created = [AgentRead.model_validate(a) for a in created]
+
+    changes = [{"id": u.id, **u.model_dump(exclude_unset=True)} for u in payload.update]
+    changes = [c for c in changes if len(c) > 1]
+    if changes:
+        db.execute(update(models.Agent), changes)
+    if update_ids:
+        updated = db.scalars(
+            select(models.Agent).where(models.Agent.id.in_(update_ids)).execution_options(populate_existing=True)
+        )
+        result.updated = [AgentRead.model_validate(a) for a in updated]
+
+    if delete_ids:
+        db.execute(
+            delete(models.Agent).where(models.Agent.id.in_(delete_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        result.deleted = len(delete_ids)
+
+    db.commit()
+    return result
@@ -1,5 +1,8 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
@@ -7,10 +10,11 @@ from jose import jwt, JWTError
 import os
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db import models
-from .deps import get_db
+from .deps import get_async_db
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -22,6 +26,13 @@ SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "CHANGE_ME_SECRET")  # override via en
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
+# Verified tokens are trusted for this long before the user row is read again
+TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "30"))
+TOKEN_CACHE_MAX = int(os.getenv("AUTH_TOKEN_CACHE_MAX", "10000"))
+# bcrypt runs in a small process pool; at most HASH_MAX_INFLIGHT hashes are queued at once
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+HASH_MAX_INFLIGHT = int(os.getenv("AUTH_HASH_MAX_INFLIGHT", str(HASH_WORKERS * 4)))
+
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -41,6 +52,36 @@ def verify_password(p: str, hashed: str) -> bool:
     return pwd_context.verify(p, hashed)
 
 
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+
+async def _run_hasher(fn, *args):
+    """Run bcrypt off the event loop and off the API threadpool."""
+    global _hash_pool, _hash_slots
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(HASH_MAX_INFLIGHT)
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+async def hash_password_async(p: str) -> str:
+    return await _run_hasher(hash_password, p)
+
+
+async def verify_password_async(p: str, hashed: str) -> bool:
+    return await _run_hasher(verify_password, p, hashed)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -48,7 +89,49 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+class _CachedIdentity(NamedTuple):
+    id: int
+    email: str
+    created_at: Optional[datetime]
+    token_version: int
+    expires_at: float
+
+
+_token_cache: Dict[str, _CachedIdentity] = {}
+# Latest token_version seen per user in this process; a newer version evicts cached tokens
+_token_versions: Dict[int, int] = {}
+
+
+def _cache_identity(token: str, user: models.User, token_exp: float) -> None:
+    if len(_token_cache) >= TOKEN_CACHE_MAX:
+        _token_cache.pop(next(iter(_token_cache)))
+    _token_cache[token] = _CachedIdentity(
+        user.id, user.email, user.created_at, user.token_version or 0,
+        min(time.time() + TOKEN_CACHE_TTL, token_exp),
+    )
+    _token_versions[user.id] = max(_token_versions.get(user.id, 0), user.token_version or 0)
+
+
+def _cached_user(token: str) -> Optional[models.User]:
+    hit = _token_cache.get(token)
+    if hit is None:
+        return None
+    if hit.expires_at <= time.time() or hit.token_version < _token_versions.get(hit.id, 0):
+        _token_cache.pop(token, None)
+        return None
+    # Detached copy: enough for identity checks; load the row before writing to it
+    return models.User(id=hit.id, email=hit.email, created_at=hit.created_at, token_version=hit.token_version)
+
+
+def invalidate_user_tokens(user_id: int, token_version: int) -> None:
+    _token_versions[user_id] = max(_token_versions.get(user_id, 0), token_version)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> models.User:
+    cached = _cached_user(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(status_code=401, detail="Could not validate credentials")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -57,33 +140,51 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter_by(email=email).first()
-    if not user:
+    user = (await db.scalars(select(models.User).filter_by(email=email))).first()
+    if not user or payload.get("ver", 0) != (user.token_version or 0):
         raise credentials_exception
+    _cache_identity(token, user, float(payload["exp"]))
     return user
 
 
+def _issue_token(user: models.User) -> str:
+    return create_access_token({"sub": user.email, "ver": user.token_version or 0})
+
+
 @router.post("/register", response_model=Token)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
-    exists = db.query(models.User).filter_by(email=payload.email).first()
+async def register(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    exists = (await db.scalars(select(models.User.id).filter_by(email=payload.email))).first()
     if exists:
         raise HTTPException(status_code=409, detail="Email already registered")
-    user = models.User(email=payload.email, password_hash=hash_password(payload.password))
+    user = models.User(email=payload.email, password_hash=await hash_password_async(payload.password), token_version=0)
     db.add(user)
-    db.commit()
-    access_token = create_access_token({"sub": user.email})
+    await db.commit()
+    access_token = _issue_token(user)
     return {"access_token": access_token}
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter_by(email=form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.scalars(select(models.User).filter_by(email=form_data.username))).first()
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    token = create_access_token({"sub": user.email})
+    token = _issue_token(user)
     return {"access_token": token}
 
 
+@router.post("/logout-all", status_code=204)
+async def logout_all(current: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Revoke every token issued to the current user."""
+    version = await db.scalar(
+        update(models.User).where(models.User.id == current.id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+    )
+    await db.commit()
+    invalidate_user_tokens(current.id, version)
+    return None
+
+
 @router.get("/me")
 def me(current: models.User = Depends(get_current_user)):
     return {"id": current.id, "email": current.email, "created_at": current.created_at}
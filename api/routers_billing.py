@@ -1,12 +1,14 @@
 from typing import Optional
 import stripe
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 import os
 
 from db import models
-from .deps import get_db, get_stripe_key
+from .deps import get_async_db, get_stripe_key
 from .routers_auth import get_current_user
 from .schemas import CheckoutSessionRequest
 
@@ -18,26 +20,36 @@ class CreateBillingPortalRequest(BaseModel):
     return_url: str
 
 
+def configure_stripe(stripe_key: Optional[str]) -> None:
+    if not stripe_key:
+        raise HTTPException(status_code=500, detail="Stripe key not configured")
+    stripe.api_key = stripe_key
+    # Point at a local fake (e.g. stripe-mock on http://localhost:12111) in tests
+    api_base = os.getenv("STRIPE_API_BASE")
+    if api_base:
+        stripe.api_base = api_base
+
+
 @router.post("/checkout")
 async def create_checkout_session(
     request: CheckoutSessionRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     stripe_key: str = Depends(get_stripe_key)
 ):
     """Create a Stripe checkout session for subscription"""
-    if not stripe_key:
-        raise HTTPException(status_code=500, detail="Stripe key not configured")
-    stripe.api_key = stripe_key
+    configure_stripe(stripe_key)
     try:
         # Get or create Stripe customer
-        customer = await get_or_create_stripe_customer(current_user, db)
+        customer_id = await get_or_create_stripe_customer(current_user, db)
 
         success_url = f"{os.getenv('FRONTEND_URL', 'http://localhost:8080')}/app/dashboard?success=true"
         cancel_url = f"{os.getenv('FRONTEND_URL', 'http://localhost:8080')}/pricing?canceled=true"
 
-        checkout_session = stripe.checkout.Session.create(
-            customer=customer.id,
+        checkout_session = await run_in_threadpool(
+            stripe.checkout.Session.create,
+            customer=customer_id,
+            client_reference_id=str(current_user.id),
             payment_method_types=['card'],
             line_items=[{
                 'price': request.price_id,
@@ -59,15 +71,18 @@ async def create_checkout_session(
 async def create_billing_portal(
     request: CreateBillingPortalRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    stripe_key: str = Depends(get_stripe_key)
 ):
     """Create a Stripe billing portal session"""
+    configure_stripe(stripe_key)
     try:
         # Get or create Stripe customer
-        customer = await get_or_create_stripe_customer(current_user, db)
+        customer_id = await get_or_create_stripe_customer(current_user, db)
 
-        portal_session = stripe.billing_portal.Session.create(
-            customer=customer.id,
+        portal_session = await run_in_threadpool(
+            stripe.billing_portal.Session.create,
+            customer=customer_id,
             return_url=request.return_url,
         )
 
@@ -80,59 +95,106 @@ async def create_billing_portal(
 @router.get("/subscription-status")
 async def get_subscription_status(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get current subscription status for user"""
+    """Get current subscription status for user, answered from the state kept by the webhook"""
+    user = await db.get(models.User, current_user.id)
+    if user and user.subscription_status == "active":
+        return {
+            "status": "active",
+            "subscription_id": user.stripe_subscription_id,
+            "current_period_end": user.subscription_period_end,
+            "plan_name": user.subscription_plan or "Premium Plan",
+            "cancel_at_period_end": bool(user.subscription_cancel_at_period_end)
+        }
+    return {"status": "inactive"}
+
+
+@router.post("/webhook")
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Receive Stripe events and mirror customer/subscription state onto the user"""
+    secret = os.getenv("STRIPE_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=500, detail="Stripe webhook secret not configured")
+    payload = await request.body()
     try:
-        # Get Stripe customer
-        customer = await get_or_create_stripe_customer(current_user, db)
-
-        # Get active subscriptions
-        subscriptions = stripe.Subscription.list(
-            customer=customer.id,
-            status='active',
-            limit=1
+        event = stripe.Webhook.construct_event(payload, request.headers.get("stripe-signature", ""), secret)
+    except (ValueError, stripe.error.SignatureVerificationError):
+        raise HTTPException(status_code=400, detail="Invalid Stripe signature")
+
+    obj = event["data"]["object"]
+    if event["type"] == "checkout.session.completed":
+        user_id = obj.get("client_reference_id")
+        if user_id and obj.get("customer"):
+            await db.execute(
+                update(models.User)
+                .where(models.User.id == int(user_id), models.User.stripe_customer_id.is_(None))
+                .values(stripe_customer_id=obj["customer"])
+            )
+    elif event["type"] in (
+        "customer.subscription.created",
+        "customer.subscription.updated",
+        "customer.subscription.deleted",
+    ):
+        await apply_subscription_event(db, obj, event["created"])
+    await db.commit()
+    return {"received": True}
+
+
+# Statuses with which a subscription replaces the one stored for the customer
+TAKEOVER_STATUSES = ("active", "trialing")
+
+
+async def apply_subscription_event(db: AsyncSession, subscription, event_created: int) -> None:
+    """Store subscription state, ignoring events older than the last one applied.
+
+    Only one subscription is kept per user: events of another subscription of the same
+    customer are ignored unless they make that subscription active (a late update or
+    deletion of an old subscription must not downgrade the current one).
+    """
+    items = (subscription.get("items") or {}).get("data") or []
+    price = items[0].get("price") if items else None
+    plan_name = (price or {}).get("nickname")
+    conditions = [
+        models.User.stripe_customer_id == subscription["customer"],
+        (models.User.subscription_event_at.is_(None)) | (models.User.subscription_event_at <= event_created),
+    ]
+    if subscription["status"] not in TAKEOVER_STATUSES:
+        conditions.append(
+            (models.User.stripe_subscription_id.is_(None)) | (models.User.stripe_subscription_id == subscription["id"])
         )
+    await db.execute(
+        update(models.User)
+        .where(*conditions)
+        .values(
+            stripe_subscription_id=subscription["id"],
+            subscription_status=subscription["status"],
+            subscription_plan=plan_name,
+            subscription_period_end=subscription.get("current_period_end"),
+            subscription_cancel_at_period_end=bool(subscription.get("cancel_at_period_end")),
+            subscription_event_at=event_created,
+        )
+    )
 
-        if subscriptions.data:
-            subscription = subscriptions.data[0]
-            return {
-                "status": "active",
-                "subscription_id": subscription.id,
-                "current_period_end": subscription.current_period_end,
-                "plan_name": subscription.items.data[0].price.nickname or "Premium Plan",
-                "cancel_at_period_end": subscription.cancel_at_period_end
-            }
-        else:
-            return {"status": "inactive"}
-
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
+async def get_or_create_stripe_customer(user: models.User, db: AsyncSession) -> str:
+    """Return the user's Stripe customer id, creating and persisting it on first use"""
+    row = await db.get(models.User, user.id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if row.stripe_customer_id:
+        return row.stripe_customer_id
 
-async def get_or_create_stripe_customer(user: models.User, db: Session):
-    """Get existing Stripe customer or create new one"""
-    # Check if user already has a Stripe customer ID
-    if hasattr(user, 'stripe_customer_id') and user.stripe_customer_id:
-        try:
-            return stripe.Customer.retrieve(user.stripe_customer_id)
-        except stripe.error.InvalidRequestError:
-            # Customer doesn't exist in Stripe, create new one
-            pass
-
-    # Create new Stripe customer
-    customer = stripe.Customer.create(
-        email=user.email,
-        name=user.email.split('@')[0],  # Use email prefix as name
+    # Idempotency key makes concurrent first checkouts resolve to the same customer
+    customer = await run_in_threadpool(
+        stripe.Customer.create,
+        email=row.email,
+        name=row.email.split('@')[0],  # Use email prefix as name
         metadata={
-            'user_id': str(user.id)
-        }
+            'user_id': str(row.id)
+        },
+        idempotency_key=f"user-{row.id}-customer",
     )
-
-    # Save customer ID to user (assuming we add this field to User model)
-    # For now, we'll just return the customer
-    # In production, you'd want to save this to the database
-    # user.stripe_customer_id = customer.id
-    # db.commit()
-
-    return customer
\ No newline at end of file
+    row.stripe_customer_id = customer.id
+    await db.commit()
+    return customer.id
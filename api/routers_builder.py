@@ -1,73 +1,30 @@
+import copy
+import hashlib
 import os
 import json
-from fastapi import APIRouter, Depends, HTTPException
+import threading
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple, Tuple
 from db import models
+from db.bulk import insert_returning_ids
+from src.flow_index import get_flow_index
+from src.flow_templates import get_template_library
+from src.project_import import link_task_context
+from src.settings import get_setting
 from .deps import get_db
-from .schemas import AIBuilderRequest, AIBuilderResponse
-from .utils_settings import get_setting
+from .schemas import AIBuilderCloneRequest, AIBuilderRequest, AIBuilderResponse, SimilarFlow, SimilarFlowResult
 
 router = APIRouter(prefix="/builder", tags=["builder"]) 
 
-def parse_sentiment_analysis_prompt(prompt_text: str) -> Dict[str, Any]:
-    """Análise especializada para prompt de sentimento"""
-    has_sentiment = any(word in prompt_text.lower() for word in ['sentimento', 'sentiment', 'emoção', 'positivo', 'negativo', 'neutro'])
-    has_comments = any(word in prompt_text.lower() for word in ['comentário', 'feedback', 'avaliação', 'review', 'opinião', 'cliente'])
-    has_separation = any(word in prompt_text.lower() for word in ['separar', 'classificar', 'categorizar', 'dividir', 'agrupar'])
-    
-    if has_sentiment and (has_comments or has_separation):
-        return {
-            "detected_type": "sentiment_analysis",
-            "agents": [
-                {
-                    "name": "Coletor de Comentários",
-                    "role": "Especialista em Coleta de Dados",
-                    "goal": "Coletar e preparar comentários de clientes para análise",
-                    "backstory": "Experiência em extração e estruturação de dados de diversas fontes.",
-                    "tools": ["WebSearchTool", "FileReaderTool"],
-                },
-                {
-                    "name": "Analista de Sentimentos",
-                    "role": "Especialista em Análise de Sentimento",
-                    "goal": "Analisar o sentimento e emoções nos comentários coletados",
-                    "backstory": "Especialista em processamento de linguagem natural e análise emocional.",
-                    "tools": ["TXTSearchTool"],
-                },
-                {
-                    "name": "Gerador de Relatórios",
-                    "role": "Especialista em Visualização de Dados",
-                    "goal": "Criar relatórios visuais com insights dos sentimentos analisados",
-                    "backstory": "Experiência em data storytelling e criação de dashboards.",
-                    "tools": ["FileWriterTool"],
-                }
-            ],
-            "tasks": [
-                {
-                    "agent_idx": 0,
-                    "description": "Coletar comentários de clientes sobre {produto} das últimas {periodo} semanas",
-                    "expected_output": "Lista estruturada de comentários com data, fonte e conteúdo completo",
-                },
-                {
-                    "agent_idx": 1,
-                    "description": "Analisar o sentimento de cada comentário coletado e classificar como Positivo, Negativo ou Neutro",
-                    "expected_output": "Tabela com comentário, classificação de sentimento, score de confiança e principais emoções detectadas",
-                },
-                {
-                    "agent_idx": 2,
-                    "description": "Criar um relatório detalhado separando comentários por sentimento e gerando insights acionáveis",
-                    "expected_output": "Relatório com: 1) Distribuição de sentimentos, 2) Top 5 temas positivos, 3) Top 5 temas negativos, 4) Recomendações de ação",
-                }
-            ]
-        }
-    return {"detected_type": "generic"}
-
 def analyze_prompt_with_llm(project, prompt_text: str, db: Session) -> Dict[str, Any]:
     """Analisa o prompt usando LLM se disponível, senão usa heurísticas"""
     try:
-        # Primeiro, tentar análise especializada
-        specialized = parse_sentiment_analysis_prompt(prompt_text)
-        if specialized["detected_type"] != "generic":
+        # Primeiro, tentar um template da biblioteca (templates/flows/*.yaml)
+        specialized = get_template_library().match(prompt_text)
+        if specialized:
             return specialized
             
         # Se não for especializado, usar LLM ou fallback genérico
@@ -81,7 +38,11 @@ def analyze_prompt_with_llm(project, prompt_text: str, db: Session) -> Dict[str,
     except Exception:
         pass
     
-    # Fallback genérico
+    return generic_analysis(prompt_text)
+
+
+def generic_analysis(prompt_text: str) -> Dict[str, Any]:
+    """Fallback genérico: um agente que executa o prompt como está"""
     return {
         "detected_type": "generic",
         "agents": [
@@ -102,35 +63,212 @@ def analyze_prompt_with_llm(project, prompt_text: str, db: Session) -> Dict[str,
         ]
     }
 
-@router.get("/find-similar")
-def find_similar_flow(project_id: int, prompt: str, db: Session = Depends(get_db)):
-    """Busca fluxos similares existentes no projeto"""
-    project = db.query(models.Project).filter_by(id=project_id).first()
-    if not project:
+# Template matches are cached per worker by normalized prompt + project language
+ANALYSIS_CACHE_TTL = float(os.getenv("BUILDER_CACHE_TTL", "3600"))
+ANALYSIS_CACHE_MAX = int(os.getenv("BUILDER_CACHE_MAX", "1024"))
+
+
+class _CachedAnalysis(NamedTuple):
+    analysis: Optional[Dict[str, Any]]  # None: no template matched
+    expires_at: float
+
+
+_analysis_cache: Dict[str, _CachedAnalysis] = {}
+_analysis_lock = threading.Lock()
+
+
+def analysis_cache_key(prompt_text: str, language: Optional[str], templates_generation: int = 0) -> str:
+    normalized = " ".join(prompt_text.lower().split())
+    raw = f"{templates_generation}\0{language or ''}\0{normalized}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cached_analysis(project, prompt_text: str, db: Session) -> Dict[str, Any]:
+    """analyze_prompt_with_llm, memoized; edits to the template library invalidate entries.
+
+    Only template results are kept: they depend on the prompt's words alone. The generic
+    fallback quotes the prompt verbatim, so for it only the miss is cached and the
+    analysis is rebuilt from this exact prompt.
+    """
+    key = analysis_cache_key(prompt_text, project.language, get_template_library().generation)
+    now = time.monotonic()
+    with _analysis_lock:
+        hit = _analysis_cache.get(key)
+        if hit is not None and hit.expires_at > now:
+            return copy.deepcopy(hit.analysis) if hit.analysis is not None else generic_analysis(prompt_text)
+    analysis = analyze_prompt_with_llm(project, prompt_text, db)
+    template = None if analysis.get("detected_type") == "generic" else copy.deepcopy(analysis)
+    with _analysis_lock:
+        if len(_analysis_cache) >= ANALYSIS_CACHE_MAX:
+            _analysis_cache.pop(next(iter(_analysis_cache)))
+        _analysis_cache[key] = _CachedAnalysis(template, now + ANALYSIS_CACHE_TTL)
+    return analysis
+
+
+# Minimum cosine score for a flow to be offered for reuse
+SIMILAR_FLOW_MIN_SCORE = float(os.getenv("SIMILAR_FLOW_MIN_SCORE", "0.1"))
+
+
+def _flow_counts(db: Session, project_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    counts = {pid: {"agents_count": 0, "tasks_count": 0} for pid in project_ids}
+    for model, key in ((models.Agent, "agents_count"), (models.Task, "tasks_count")):
+        rows = db.execute(
+            select(model.project_id, func.count(model.id))
+            .where(model.project_id.in_(project_ids)).group_by(model.project_id)
+        )
+        for pid, n in rows:
+            counts[pid][key] = n
+    return counts
+
+
+@router.get("/find-similar", response_model=SimilarFlowResult)
+def find_similar_flow(project_id: int, prompt: str, limit: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    """Busca, em todos os projetos, os fluxos mais parecidos com o prompt.
+
+    ``found`` só indica um fluxo parecido neste projeto (já carregado no editor); os de
+    outros projetos vão em ``matches``, como candidatos para ``POST /builder/clone``.
+    """
+    if not db.get(models.Project, project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Buscar por palavras-chave no prompt
-    keywords = prompt.lower().split()
-    agents = db.query(models.Agent).filter_by(project_id=project_id).all()
-    tasks = db.query(models.Task).filter_by(project_id=project_id).all()
-    
-    # Check if we already have sentiment analysis flow
-    has_sentiment_flow = False
-    for agent in agents:
-        if any(word in agent.name.lower() or word in agent.role.lower() 
-               for word in ['sentimento', 'analista', 'coletor', 'relatório']):
-            has_sentiment_flow = True
-            break
-    
-    if has_sentiment_flow and any(word in prompt.lower() for word in ['sentimento', 'comentário', 'análise']):
-        return {
-            "found": True,
-            "message": "Fluxo de análise de sentimentos já existe neste projeto. Carregando...",
-            "agents_count": len(agents),
-            "tasks_count": len(tasks)
+
+    index = get_flow_index()
+    index.refresh(db)
+    hits = [(pid, score) for pid, score in index.search(prompt, k=limit + 1) if score >= SIMILAR_FLOW_MIN_SCORE]
+    if not hits:
+        return SimilarFlowResult(found=False)
+
+    ids = [pid for pid, _ in hits]
+    names = dict(db.execute(select(models.Project.id, models.Project.name).where(models.Project.id.in_(ids))).all())
+    counts = _flow_counts(db, ids)
+    flows = [
+        SimilarFlow(project_id=pid, name=names[pid], score=score, **counts[pid])
+        for pid, score in hits if pid in names and counts[pid]["agents_count"]
+    ]
+    own = next((f for f in flows if f.project_id == project_id), None)
+    matches = [f for f in flows if f.project_id != project_id][:limit]
+    if own is None:
+        return SimilarFlowResult(found=False, matches=matches)
+    return SimilarFlowResult(
+        found=True,
+        message="Um fluxo parecido já existe neste projeto. Carregando...",
+        project_id=own.project_id,
+        agents_count=own.agents_count,
+        tasks_count=own.tasks_count,
+        matches=matches,
+    )
+
+
+def insert_flow(db: Session, project_id: int, agents: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> Tuple[List[int], int]:
+    """Insert agent and task specs with one bulk statement per table (caller commits).
+
+    Tasks reference agents by ``agent_idx`` (position in ``agents``) and earlier tasks by
+    ``context`` (positions in ``tasks``); tasks pointing past the last agent are skipped.
+    Returns the new agent ids and the number of created tasks.
+    """
+    if not agents:
+        return [], 0
+    agent_rows = [
+        {
+            "project_id": project_id,
+            "name": a["name"],
+            "role": a["role"],
+            "goal": a["goal"],
+            "backstory": a.get("backstory") or "",
+            "tools": a.get("tools") or [],
+            "verbose": bool(a.get("verbose", True)),
+            "memory": bool(a.get("memory", False)),
+            "allow_delegation": bool(a.get("allow_delegation", False)),
         }
-    
-    return {"found": False}
+        for a in agents
+    ]
+    agent_ids = insert_returning_ids(db, models.Agent, agent_rows)
+    positions = [pos for pos, t in enumerate(tasks) if t.get("agent_idx", 0) < len(agent_ids)]
+    task_rows = [
+        {
+            "project_id": project_id,
+            "agent_id": agent_ids[t.get("agent_idx", 0)],
+            "description": t["description"],
+            "expected_output": t.get("expected_output") or "",
+            "tools": t.get("tools") or [],
+            "async_execution": bool(t.get("async_execution", False)),
+            "output_file": t.get("output_file") or "",
+        }
+        for t in (tasks[pos] for pos in positions)
+    ]
+    link_task_context(db, tasks, positions, insert_returning_ids(db, models.Task, task_rows))
+    return list(agent_ids), len(task_rows)
+
+
+def clone_flow(db: Session, source_project_id: int, target_project_id: int) -> Tuple[List[str], int]:
+    """Copy all agents and tasks of one project into another (caller commits).
+
+    Returns the names of the created agents and the number of created tasks.
+    """
+    agents = db.scalars(
+        select(models.Agent).where(models.Agent.project_id == source_project_id).order_by(models.Agent.id)
+    ).all()
+    if not agents:
+        return [], 0
+    position = {a.id: i for i, a in enumerate(agents)}
+    tasks = db.scalars(
+        select(models.Task).where(models.Task.project_id == source_project_id).order_by(models.Task.id)
+    ).all()
+    agent_specs = [
+        {
+            "name": a.name,
+            "role": a.role,
+            "goal": a.goal,
+            "backstory": a.backstory,
+            "tools": a.tools,
+            "verbose": a.verbose,
+            "memory": a.memory,
+            "allow_delegation": a.allow_delegation,
+        }
+        for a in agents
+    ]
+    tasks = [t for t in tasks if t.agent_id in position]
+    task_position = {t.id: i for i, t in enumerate(tasks)}
+    task_specs = [
+        {
+            "agent_idx": position[t.agent_id],
+            "description": t.description,
+            "expected_output": t.expected_output,
+            "tools": t.tools,
+            "async_execution": t.async_execution,
+            "output_file": t.output_file,
+            "context": [task_position[c] for c in t.context or [] if c in task_position],
+        }
+        for t in tasks
+    ]
+    _, tasks_count = insert_flow(db, target_project_id, agent_specs, task_specs)
+    return [a.name for a in agents], tasks_count
+
+
+@router.post("/clone", response_model=AIBuilderResponse)
+def clone_similar_flow(payload: AIBuilderCloneRequest, db: Session = Depends(get_db)):
+    """Reutiliza um fluxo existente (ex.: encontrado via /builder/find-similar)"""
+    if not db.get(models.Project, payload.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    source = db.get(models.Project, payload.source_project_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source project not found")
+    if source.id == payload.project_id:
+        raise HTTPException(status_code=400, detail="Source and target project must differ")
+
+    agent_names, tasks_count = clone_flow(db, source.id, payload.project_id)
+    if not agent_names:
+        raise HTTPException(status_code=400, detail="Source project has no agents")
+    db.commit()
+
+    plan = (
+        f"Fluxo clonado do projeto '{source.name}'!\n\n"
+        f"- {len(agent_names)} agente(s) criado(s)\n"
+        f"- {tasks_count} tarefa(s) configurada(s)\n\n"
+        "Agentes Criados:\n"
+        + "".join(f"- {name}\n" for name in agent_names)
+        + "\nClique em Run para executar o fluxo!"
+    )
+    return AIBuilderResponse(created_agents=len(agent_names), created_tasks=tasks_count, plan=plan)
 
 @router.post("/generate", response_model=AIBuilderResponse)
 def generate_from_prompt(payload: AIBuilderRequest, db: Session = Depends(get_db)):
@@ -138,68 +276,33 @@ def generate_from_prompt(payload: AIBuilderRequest, db: Session = Depends(get_db
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Analisar o prompt para determinar tipo de fluxo
-    analysis = analyze_prompt_with_llm(project, payload.prompt, db)
-    
-    created_agents = []
-    created_tasks = []
-    
-    # Criar agentes baseado na análise
-    for agent_spec in analysis.get("agents", []):
-        agent = models.Agent(
-            project_id=project.id,
-            name=agent_spec["name"],
-            role=agent_spec["role"],
-            goal=agent_spec["goal"],
-            backstory=agent_spec.get("backstory", ""),
-            tools=agent_spec.get("tools", []),
-            verbose=True,
-            memory=agent_spec.get("memory", False),
-            allow_delegation=agent_spec.get("allow_delegation", False),
-        )
-        db.add(agent)
-        db.flush()  # Para obter o ID antes do commit
-        created_agents.append(agent)
-    
-    # Criar tarefas vinculadas aos agentes
-    for task_spec in analysis.get("tasks", []):
-        agent_idx = task_spec.get("agent_idx", 0)
-        if agent_idx < len(created_agents):
-            task = models.Task(
-                project_id=project.id,
-                agent_id=created_agents[agent_idx].id,
-                description=task_spec["description"],
-                expected_output=task_spec["expected_output"],
-                tools=task_spec.get("tools", []),
-                async_execution=task_spec.get("async_execution", False),
-                output_file=task_spec.get("output_file", ""),
-            )
-            db.add(task)
-            created_tasks.append(task)
-    
+    # Analisar o prompt para determinar tipo de fluxo (reaproveita análises de prompts idênticos)
+    analysis = cached_analysis(project, payload.prompt, db)
+    agent_specs = analysis.get("agents", [])
+    agent_ids, tasks_count = insert_flow(db, project.id, agent_specs, analysis.get("tasks", []))
     db.commit()
-    
+    created_agents = agent_specs[:len(agent_ids)]
+
     # Gerar plano descritivo sem formatação markdown
-    if analysis["detected_type"] == "sentiment_analysis":
+    if analysis.get("process"):
         plan = (
-            "Fluxo de Análise de Sentimentos Criado!\n\n"
+            f"Fluxo de {analysis['title']} Criado!\n\n"
             "Estrutura do Workflow:\n"
             f"- {len(created_agents)} agentes especializados\n"
-            f"- {len(created_tasks)} tarefas sequenciais\n\n"
+            f"- {tasks_count} tarefas sequenciais\n\n"
             "Agentes Criados:\n"
         )
         for agent in created_agents:
-            plan += f"- {agent.name}: {agent.role}\n"
+            plan += f"- {agent['name']}: {agent['role']}\n"
         plan += "\nProcesso:\n"
-        plan += "1. Coleta de comentários de múltiplas fontes\n"
-        plan += "2. Análise de sentimento com classificação\n"
-        plan += "3. Geração de relatório com insights\n\n"
-        plan += "Clique em Run para executar o fluxo!"
+        for i, step in enumerate(analysis["process"], 1):
+            plan += f"{i}. {step}\n"
+        plan += "\nClique em Run para executar o fluxo!"
     else:
         plan = (
             "Fluxo Criado com Sucesso!\n\n"
             f"- {len(created_agents)} agente(s) criado(s)\n"
-            f"- {len(created_tasks)} tarefa(s) configurada(s)\n\n"
+            f"- {tasks_count} tarefa(s) configurada(s)\n\n"
             "Você pode:\n"
             "- Conectar mais agentes/tarefas no editor\n"
             "- Configurar ferramentas específicas\n"
@@ -208,6 +311,6 @@ def generate_from_prompt(payload: AIBuilderRequest, db: Session = Depends(get_db
     
     return AIBuilderResponse(
         created_agents=len(created_agents),
-        created_tasks=len(created_tasks),
+        created_tasks=tasks_count,
         plan=plan
     )
@@ -1,33 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from functools import partial
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from db import models
-from .deps import get_db
+from .deps import get_db, get_async_db
+from .utils_http import rows_response, schema_columns
 from .schemas import ExecutionRead, ExecuteRequest
-from src.executor import execute as crew_execute, execute_in_background
+from src.executor import RUNNER_ID, execute as crew_execute, execute_in_background
+from src.scheduler import scheduler
+from src.settings import get_setting
+
+# With EXECUTE_SINGLE_FLIGHT on, a run older than this (s) is assumed dead and new requests stop attaching to it
+EXECUTE_FLIGHT_MAX_AGE = float(os.getenv("EXECUTE_FLIGHT_MAX_AGE", "3600"))
 
 
 router = APIRouter(tags=["executions"]) 
 
 
 @router.get("/executions", response_model=List[ExecutionRead])
-def list_executions(project_id: Optional[int] = None, db: Session = Depends(get_db)):
-    q = db.query(models.Execution)
+async def list_executions(project_id: Optional[int] = None, limit: Optional[int] = None, offset: int = 0, db: AsyncSession = Depends(get_async_db)):
+    q = select(*schema_columns(models.Execution, ExecutionRead))
     if project_id:
         q = q.filter_by(project_id=project_id)
-    return q.order_by(models.Execution.id.desc()).all()
+    q = q.order_by(models.Execution.id.desc()).offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    rows = [dict(r) for r in (await db.execute(q)).mappings()]
+    estimates = scheduler.estimates()
+    for row in rows:
+        row["queue_position"], row["estimated_wait_s"] = estimates.get(row["id"], (None, None))
+    return rows_response(rows)
+
+
+def _with_queue(exe: models.Execution) -> ExecutionRead:
+    """ExecutionRead with the queue position and estimated wait of a run still waiting for a worker."""
+    result = ExecutionRead.model_validate(exe)
+    result.queue_position, result.estimated_wait_s = scheduler.estimate(exe.id)
+    return result
 
 
 @router.get("/executions/{execution_id}", response_model=ExecutionRead)
-def get_execution(execution_id: int, db: Session = Depends(get_db)):
-    exe = db.query(models.Execution).filter_by(id=execution_id).first()
+async def get_execution(execution_id: int, db: AsyncSession = Depends(get_async_db)):
+    exe = await db.get(models.Execution, execution_id)
     if not exe:
         raise HTTPException(status_code=404, detail="Execution not found")
+    return _with_queue(exe)
+
+
+def _request_hash(target: str, payload: ExecuteRequest) -> str:
+    blob = json.dumps([target, payload.inputs or {}, payload.language], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _in_flight(db: Session, flight_key: str) -> Optional[models.Execution]:
+    exe = db.query(models.Execution).filter_by(flight_key=flight_key).first()
+    if exe and exe.created_at:
+        started = exe.created_at if exe.created_at.tzinfo else exe.created_at.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - started).total_seconds() > EXECUTE_FLIGHT_MAX_AGE:
+            exe.flight_key = None
+            db.commit()
+            return None
     return exe
 
 
+def _start_execution(
+    db: Session,
+    response: Response,
+    project: models.Project,
+    target: str,
+    input_payload: Dict[str, Any],
+    payload: ExecuteRequest,
+    idempotency_key: Optional[str],
+) -> ExecutionRead:
+    """Create the execution and queue it, unless the request is a retry or a duplicate.
+
+    A repeated Idempotency-Key returns the execution it first created. With the
+    EXECUTE_SINGLE_FLIGHT setting on, a request identical to a running one (same target,
+    project content version, inputs and language) attaches to that execution.
+    """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= 200:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must have 1 to 200 characters")
+    request_hash = _request_hash(target, payload)
+    flight_key = None
+    if get_setting(db, "EXECUTE_SINGLE_FLIGHT", "false").lower() in ("1", "true", "yes", "on"):
+        flight_key = hashlib.sha256(f"{project.id}:{project.content_version}:{request_hash}".encode()).hexdigest()
+
+    # A concurrent request may claim the key or the flight first; look again once after losing
+    for _ in range(2):
+        if idempotency_key is not None:
+            known = db.get(models.IdempotencyKey, idempotency_key)
+            if known is not None:
+                if known.request_hash != request_hash:
+                    raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+                response.headers["Idempotent-Replayed"] = "true"
+                return _with_queue(known.execution)
+        exe = _in_flight(db, flight_key) if flight_key else None
+        attached = exe is not None
+        try:
+            if not attached:
+                exe = models.Execution(
+                    project_id=project.id, status="created", input_payload=input_payload, logs="", flight_key=flight_key,
+                    runner=RUNNER_ID, heartbeat_at=datetime.now(timezone.utc),
+                )
+                db.add(exe)
+                db.flush()
+            if idempotency_key is not None:
+                db.add(models.IdempotencyKey(key=idempotency_key, execution_id=exe.id, request_hash=request_hash))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        db.refresh(exe)
+        if not attached:
+            # Runs with incremental logs once the scheduler gives it a worker
+            run = partial(execute_in_background, exe.id, project.id, payload.inputs or {}, payload.language)
+            scheduler.submit(exe.id, project.id, run, payload.priority)
+        return _with_queue(exe)
+    raise HTTPException(status_code=409, detail="A concurrent identical request is being processed; retry")
+
+
 @router.post("/execute/project/{project_id}", response_model=ExecutionRead)
-def execute_project(project_id: int, payload: ExecuteRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
+def execute_project(
+    project_id: int,
+    payload: ExecuteRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     project = db.query(models.Project).filter_by(id=project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -35,19 +141,19 @@ def execute_project(project_id: int, payload: ExecuteRequest, background: Backgr
     tasks = db.query(models.Task).filter_by(project_id=project.id).all()
     if not agents or not tasks:
         raise HTTPException(status_code=400, detail="Project needs at least 1 agent and 1 task")
-
-    exe = models.Execution(project_id=project.id, status="running", input_payload=payload.inputs or {}, logs="")
-    db.add(exe)
-    db.commit()
-    db.refresh(exe)
-
-    # Kick off background execution with incremental logs
-    background.add_task(execute_in_background, exe.id, project.id, payload.inputs or {}, payload.language)
-    return exe
+    return _start_execution(
+        db, response, project, f"project:{project.id}", payload.inputs or {}, payload, idempotency_key
+    )
 
 
 @router.post("/execute/agent/{agent_id}", response_model=ExecutionRead)
-def execute_agent(agent_id: int, payload: ExecuteRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
+def execute_agent(
+    agent_id: int,
+    payload: ExecuteRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     agent = db.query(models.Agent).filter_by(id=agent_id).first()
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
@@ -55,17 +161,20 @@ def execute_agent(agent_id: int, payload: ExecuteRequest, background: Background
     tasks = db.query(models.Task).filter_by(project_id=agent.project_id, agent_id=agent.id).all()
     if not tasks:
         raise HTTPException(status_code=400, detail="Agent has no tasks")
-
-    exe = models.Execution(project_id=project.id, status="running", input_payload={"agent_id": agent.id, **(payload.inputs or {})}, logs="")
-    db.add(exe)
-    db.commit()
-    db.refresh(exe)
-    background.add_task(execute_in_background, exe.id, project.id, payload.inputs or {}, payload.language)
-    return exe
+    return _start_execution(
+        db, response, project, f"agent:{agent.id}",
+        {"agent_id": agent.id, **(payload.inputs or {})}, payload, idempotency_key,
+    )
 
 
 @router.post("/execute/task/{task_id}", response_model=ExecutionRead)
-def execute_task(task_id: int, payload: ExecuteRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
+def execute_task(
+    task_id: int,
+    payload: ExecuteRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     task = db.query(models.Task).filter_by(id=task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -73,17 +182,7 @@ def execute_task(task_id: int, payload: ExecuteRequest, background: BackgroundTa
     if not agent:
         raise HTTPException(status_code=400, detail="Task agent missing")
     project = db.query(models.Project).filter_by(id=task.project_id).first()
-
-    exe = models.Execution(project_id=project.id, status="running", input_payload={"task_id": task.id, **(payload.inputs or {})}, logs="")
-    db.add(exe)
-    db.commit()
-    db.refresh(exe)
-    background.add_task(execute_in_background, exe.id, project.id, payload.inputs or {}, payload.language)
-    return exe
-
-@router.get("/executions", response_model=List[ExecutionRead])
-def list_executions(project_id: Optional[int] = None, limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    q = db.query(models.Execution)
-    if project_id:
-        q = q.filter_by(project_id=project_id)
-    return q.order_by(models.Execution.id.desc()).offset(offset).limit(limit).all()
+    return _start_execution(
+        db, response, project, f"task:{task.id}",
+        {"task_id": task.id, **(payload.inputs or {})}, payload, idempotency_key,
+    )
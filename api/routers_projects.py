@@ -1,26 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 from typing import List
 from db import models
+from src.exporter import evict_export
 from .schemas import ProjectCreate, ProjectRead, ProjectUpdate
-from .deps import get_db
+from .deps import get_db, get_async_db
+from .utils_http import rows_response
 
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.get("", response_model=List[ProjectRead])
-def list_projects(db: Session = Depends(get_db)):
-    projects = db.query(models.Project).order_by(models.Project.created_at.desc()).all()
-    # enrich with counts and last execution time
+async def list_projects(db: AsyncSession = Depends(get_async_db)):
+    projects = (await db.scalars(select(models.Project).order_by(models.Project.created_at.desc()))).all()
+    # enrich with counts and last execution time, one grouped query per table
+    agents_count = dict((await db.execute(
+        select(models.Agent.project_id, func.count(models.Agent.id)).group_by(models.Agent.project_id)
+    )).all())
+    tasks_count = dict((await db.execute(
+        select(models.Task.project_id, func.count(models.Task.id)).group_by(models.Task.project_id)
+    )).all())
+    exec_stats = {
+        pid: (count, last)
+        for pid, count, last in (await db.execute(
+            select(models.Execution.project_id, func.count(models.Execution.id), func.max(models.Execution.created_at))
+            .group_by(models.Execution.project_id)
+        )).all()
+    }
     results = []
     for p in projects:
-        agents_count = db.query(func.count(models.Agent.id)).filter_by(project_id=p.id).scalar() or 0
-        tasks_count = db.query(func.count(models.Task.id)).filter_by(project_id=p.id).scalar() or 0
-        executions_count = db.query(func.count(models.Execution.id)).filter_by(project_id=p.id).scalar() or 0
-        last_exec = db.query(func.max(models.Execution.created_at)).filter_by(project_id=p.id).scalar()
-        pr = ProjectRead.model_validate({
+        executions_count, last_exec = exec_stats.get(p.id, (0, None))
+        results.append({
             "id": p.id,
             "name": p.name,
             "description": p.description,
@@ -29,13 +42,12 @@ def list_projects(db: Session = Depends(get_db)):
             "language": getattr(p, 'language', 'pt'),
             "created_at": p.created_at,
             "updated_at": p.updated_at,
-            "agents_count": agents_count,
-            "tasks_count": tasks_count,
+            "agents_count": agents_count.get(p.id, 0),
+            "tasks_count": tasks_count.get(p.id, 0),
             "executions_count": executions_count,
             "last_execution_at": last_exec,
         })
-        results.append(pr)
-    return results
+    return rows_response(results)
 
 
 @router.post("", response_model=ProjectRead, status_code=201)
@@ -57,8 +69,8 @@ def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/{project_id}", response_model=ProjectRead)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    proj = db.query(models.Project).filter_by(id=project_id).first()
+async def get_project(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    proj = await db.get(models.Project, project_id)
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
     return proj
@@ -84,4 +96,5 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Project not found")
     db.delete(proj)
     db.commit()
+    evict_export(project_id)
     return None
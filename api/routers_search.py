@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from db.search_index import fts5_query, search_statement, snippet_html
+from .deps import get_async_db
+from .schemas import SearchResult
+
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/search", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1),
+    project_id: Optional[int] = None,
+    kind: Optional[Literal["agent", "task", "execution"]] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Ranked full-text search over agents, tasks and execution results, with highlighted snippets"""
+    dialect = db.bind.dialect.name
+    query = q if dialect == "postgresql" else fts5_query(q)
+    if not query:
+        return []
+    params = {"q": query, "limit": limit, "project_id": project_id, "kind": kind}
+    try:
+        rows = (await db.execute(search_statement(dialect, project_id, kind), params)).mappings().all()
+    except (OperationalError, ProgrammingError):
+        raise HTTPException(status_code=503, detail="Search index not available on this database")
+    return [
+        {
+            "kind": r["kind"],
+            "id": r["ref_id"],
+            "project_id": r["project_id"],
+            "title": r["title"] or "",
+            "snippet": snippet_html(r["snippet"]),
+            "score": float(r["score"] or 0),
+        }
+        for r in rows
+    ]
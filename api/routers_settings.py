@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from db import models
-from .deps import get_db
+from src.settings import bump_settings_version, invalidate_settings_cache
+from .deps import get_db, get_async_db
 from .schemas import SettingRead, SettingUpdate
 
 
@@ -10,8 +13,8 @@ router = APIRouter(prefix="/settings", tags=["settings"])
 
 
 @router.get("", response_model=List[SettingRead])
-def list_settings(db: Session = Depends(get_db)):
-    settings = db.query(models.Settings).all()
+async def list_settings(db: AsyncSession = Depends(get_async_db)):
+    settings = (await db.scalars(select(models.Settings))).all()
     return [{"key": s.key, "value": s.value} for s in settings]
 
 
@@ -23,7 +26,9 @@ def set_setting(key: str, payload: SettingUpdate, db: Session = Depends(get_db))
     else:
         s = models.Settings(key=key, value=payload.value)
         db.add(s)
+    bump_settings_version(db)
     db.commit()
+    invalidate_settings_cache()
     return {"key": key, "value": s.value}
 
 
@@ -34,5 +39,7 @@ def delete_setting(key: str, db: Session = Depends(get_db)):
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Setting not found")
     db.delete(s)
+    bump_settings_version(db)
     db.commit()
+    invalidate_settings_cache()
 
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from db import models
+from .deps import get_async_db
+from .schemas import ExecutionStats
+from src.analytics import stats_statements, summarize
+
+
+router = APIRouter(tags=["stats"])
+
+
+async def _stats(db: AsyncSession, project_id: Optional[int], days: int) -> dict:
+    by_bucket, by_day = stats_statements(project_id, days)
+    bucket_rows = (await db.execute(by_bucket)).all()
+    day_rows = (await db.execute(by_day)).all()
+    return summarize(bucket_rows, day_rows, project_id, days)
+
+
+@router.get("/projects/{project_id}/stats", response_model=ExecutionStats)
+async def project_stats(project_id: int, days: int = Query(30, ge=1, le=3660), db: AsyncSession = Depends(get_async_db)):
+    """Duration percentiles, success rate and runs per day from the hourly rollups"""
+    if not await db.get(models.Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await _stats(db, project_id, days)
+
+
+@router.get("/stats", response_model=ExecutionStats)
+async def global_stats(days: int = Query(30, ge=1, le=3660), db: AsyncSession = Depends(get_async_db)):
+    """Same as the project stats, across every project"""
+    return await _stats(db, None, days)
@@ -1,17 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterable, List, Optional
 from db import models
-from .schemas import TaskBase, TaskRead, TaskUpdate
-from .deps import get_db
+from db.bulk import insert_returning_ids
+from .schemas import TaskBase, TaskRead, TaskUpdate, TaskBatchRequest, TaskBatchResult
+from .deps import get_db, get_async_db
+from .utils_http import rows_response, schema_columns
 
 
 router = APIRouter(tags=["tasks"]) 
 
 
+def _check_context(db: Session, project_id: int, ids: Iterable[int], before: Optional[int] = None) -> None:
+    """Context must name tasks of the same project that run earlier (lower id)."""
+    ids = set(ids)
+    if not ids:
+        return
+    if before is not None and any(i >= before for i in ids):
+        raise HTTPException(status_code=400, detail="Context may only reference earlier tasks")
+    known = set(db.scalars(
+        select(models.Task.id).where(models.Task.project_id == project_id, models.Task.id.in_(ids))
+    ))
+    unknown = sorted(ids - known)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Context tasks not found in this project: {unknown}")
+
+
 @router.get("/projects/{project_id}/tasks", response_model=List[TaskRead])
-def list_tasks(project_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Task).filter_by(project_id=project_id).all()
+async def list_tasks(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    q = select(*schema_columns(models.Task, TaskRead)).filter_by(project_id=project_id)
+    return rows_response((await db.execute(q)).mappings())
 
 
 @router.post("/projects/{project_id}/tasks", response_model=TaskRead, status_code=201)
@@ -20,6 +40,7 @@ def create_task(project_id: int, payload: TaskBase, db: Session = Depends(get_db
     agent = db.query(models.Agent).filter_by(id=payload.agent_id, project_id=project_id).first()
     if not agent:
         raise HTTPException(status_code=400, detail="Agent not found in this project")
+    _check_context(db, project_id, payload.context)
 
     task = models.Task(
         project_id=project_id,
@@ -29,6 +50,7 @@ def create_task(project_id: int, payload: TaskBase, db: Session = Depends(get_db
         tools=payload.tools or [],
         async_execution=bool(payload.async_execution),
         output_file=payload.output_file or "",
+        context=payload.context,
     )
     db.add(task)
     db.commit()
@@ -47,6 +69,9 @@ def update_task(task_id: int, payload: TaskUpdate, db: Session = Depends(get_db)
         agent = db.query(models.Agent).filter_by(id=updates["agent_id"], project_id=task.project_id).first()
         if not agent:
             raise HTTPException(status_code=400, detail="Agent not found in the same project")
+    if "context" in updates:
+        updates["context"] = updates["context"] or []
+        _check_context(db, task.project_id, updates["context"], before=task.id)
     for field, value in updates.items():
         setattr(task, field, value)
     db.add(task)
@@ -63,3 +88,80 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     db.delete(task)
     db.commit()
     return None
+
+
+@router.post("/projects/{project_id}/tasks:batch", response_model=TaskBatchResult)
+def batch_tasks(project_id: int, payload: TaskBatchRequest, db: Session = Depends(get_db)):
+    """Create, update and delete tasks of a project in a single transaction."""
+    if not db.query(models.Project.id).filter_by(id=project_id).first():
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    update_ids = [u.id for u in payload.update]
+    delete_ids = list(dict.fromkeys(payload.delete))
+    if len(set(update_ids)) != len(update_ids) or set(update_ids) & set(delete_ids):
+        raise HTTPException(status_code=400, detail="Each task id may appear only once per batch")
+
+    touched = set(update_ids) | set(delete_ids)
+    if touched:
+        found = set(db.scalars(
+            select(models.Task.id).where(models.Task.project_id == project_id, models.Task.id.in_(touched))
+        ))
+        missing = sorted(touched - found)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tasks not found in this project: {missing}")
+
+    changes = [{"id": u.id, **u.model_dump(exclude_unset=True)} for u in payload.update]
+    changes = [c for c in changes if len(c) > 1]
+    agent_ids = {t.agent_id for t in payload.create} | {c["agent_id"] for c in changes if "agent_id" in c}
+    if agent_ids:
+        known = set(db.scalars(
+            select(models.Agent.id).where(models.Agent.project_id == project_id, models.Agent.id.in_(agent_ids))
+        ))
+        unknown = sorted(agent_ids - known, key=str)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Agents not found in this project: {unknown}")
+    context_ids = {i for t in payload.create for i in t.context}
+    for c in changes:
+        if "context" in c:
+            c["context"] = c["context"] or []
+            if any(i >= c["id"] for i in c["context"]):
+                raise HTTPException(status_code=400, detail="Context may only reference earlier tasks")
+            context_ids.update(c["context"])
+    _check_context(db, project_id, context_ids)
+
+    result = TaskBatchResult()
+    if payload.create:
+        rows = [
+            {
+                "project_id": project_id,
+                "agent_id": t.agent_id,
+                "description": t.description,
+                "expected_output": t.expected_output or "",
+                "tools": t.tools or [],
+                "async_execution": bool(t.async_execution),
+                "output_file": t.output_file or "",
+                "context": t.context,
+            }
+            for t in payload.create
+        ]
+        ids = insert_returning_ids(db, models.Task, rows)
+        created = db.scalars(select(models.Task).where(models.Task.id.in_(ids)).order_by(models.Task.id))
+        result.created = [TaskRead.model_validate(t) for t in created]
+
+    if changes:
+        db.execute(update(models.Task), changes)
+    if update_ids:
+        updated = db.scalars(
+            select(models.Task).where(models.Task.id.in_(update_ids)).execution_options(populate_existing=True)
+        )
+        result.updated = [TaskRead.model_validate(t) for t in updated]
+
+    if delete_ids:
+        db.execute(
+            delete(models.Task).where(models.Task.id.in_(delete_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        result.deleted = len(delete_ids)
+
+    db.commit()
+    return result
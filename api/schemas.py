@@ -77,6 +77,22 @@ class AgentRead(AgentBase):
         from_attributes = True
 
 
+class AgentBatchUpdate(AgentUpdate):
+    id: int
+
+
+class AgentBatchRequest(BaseModel):
+    create: List[AgentBase] = Field(default_factory=list)
+    update: List[AgentBatchUpdate] = Field(default_factory=list)
+    delete: List[int] = Field(default_factory=list)
+
+
+class AgentBatchResult(BaseModel):
+    created: List[AgentRead] = Field(default_factory=list)
+    updated: List[AgentRead] = Field(default_factory=list)
+    deleted: int = 0
+
+
 # ===== Task =====
 class TaskBase(BaseModel):
     agent_id: int
@@ -85,6 +101,8 @@ class TaskBase(BaseModel):
     tools: List[str] = Field(default_factory=list)
     async_execution: bool = False
     output_file: str = ""
+    # Ids of earlier tasks of the same project whose output this task receives
+    context: List[int] = Field(default_factory=list)
 
 
 class TaskCreate(TaskBase):
@@ -98,6 +116,7 @@ class TaskUpdate(BaseModel):
     tools: Optional[List[str]] = None
     async_execution: Optional[bool] = None
     output_file: Optional[str] = None
+    context: Optional[List[int]] = None
 
 
 class TaskRead(TaskBase):
@@ -108,6 +127,22 @@ class TaskRead(TaskBase):
         from_attributes = True
 
 
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBatchRequest(BaseModel):
+    create: List[TaskBase] = Field(default_factory=list)
+    update: List[TaskBatchUpdate] = Field(default_factory=list)
+    delete: List[int] = Field(default_factory=list)
+
+
+class TaskBatchResult(BaseModel):
+    created: List[TaskRead] = Field(default_factory=list)
+    updated: List[TaskRead] = Field(default_factory=list)
+    deleted: int = 0
+
+
 # ===== Execution =====
 class ExecutionRead(BaseModel):
     id: int
@@ -117,14 +152,50 @@ class ExecutionRead(BaseModel):
     output_payload: Dict[str, Any] | None = None
     logs: str | None = None
     created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Only while the run waits for a worker of the process that queued it
+    queue_position: Optional[int] = None
+    estimated_wait_s: Optional[float] = None
 
     class Config:
         from_attributes = True
 
 
+class DailyExecutionStats(BaseModel):
+    day: str
+    runs: int
+    successes: int
+    errors: int
+
+
+class ExecutionStats(BaseModel):
+    project_id: Optional[int] = None
+    days: int
+    runs: int
+    successes: int
+    errors: int
+    success_rate: Optional[float] = None
+    avg_duration_ms: Optional[float] = None
+    p50_duration_ms: Optional[float] = None
+    p95_duration_ms: Optional[float] = None
+    per_day: List[DailyExecutionStats] = Field(default_factory=list)
+
+
 class ExecuteRequest(BaseModel):
     inputs: Dict[str, Any] = Field(default_factory=dict)
     language: Optional[Literal["pt", "en", "es", "fr"]] = None
+    # Interactive runs are always dispatched before batch runs
+    priority: Literal["interactive", "batch"] = "interactive"
+
+
+# ===== Search =====
+class SearchResult(BaseModel):
+    kind: Literal["agent", "task", "execution"]
+    id: int
+    project_id: int
+    title: str
+    snippet: str
+    score: float
 
 
 # ===== Settings =====
@@ -154,3 +225,44 @@ class AIBuilderResponse(BaseModel):
     created_agents: int
     created_tasks: int
     plan: str | None = None
+
+
+class AIBuilderCloneRequest(BaseModel):
+    project_id: int
+    source_project_id: int
+
+
+class SimilarFlow(BaseModel):
+    project_id: int
+    name: str
+    score: float
+    agents_count: int
+    tasks_count: int
+
+
+class SimilarFlowResult(BaseModel):
+    found: bool
+    message: str | None = None
+    project_id: int | None = None
+    agents_count: int = 0
+    tasks_count: int = 0
+    matches: List[SimilarFlow] = []
+
+
+# ===== Import =====
+class BulkImportItem(BaseModel):
+    filename: str
+    status: Literal["created", "existing", "error"]
+    project_id: Optional[int] = None
+    name: Optional[str] = None
+    agents: int = 0
+    tasks: int = 0
+    integrations: List[str] = []
+    error: Optional[str] = None
+
+
+class BulkImportResult(BaseModel):
+    created: int = 0
+    existing: int = 0
+    failed: int = 0
+    items: List[BulkImportItem] = []
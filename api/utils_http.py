@@ -0,0 +1,52 @@
+import os
+import re
+from typing import Any, Iterable, List, Mapping, Sequence
+
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# Paths whose bodies are already compressed (ZIP downloads)
+COMPRESS_EXCLUDED = [r"^/export/"]
+
+
+def rows_response(rows: Iterable[Mapping[str, Any]], status_code: int = 200) -> ORJSONResponse:
+    """Serialize plain column rows straight to JSON, skipping response_model validation.
+
+    Meant for list endpoints whose columns already match the declared schema.
+    """
+    return ORJSONResponse([dict(r) for r in rows], status_code=status_code)
+
+
+def schema_columns(model, schema) -> List:
+    """ORM columns named like the fields of a Pydantic read schema, in schema order.
+
+    Fields with no column of that name (values computed per request) are skipped.
+    """
+    return [getattr(model, name) for name in schema.model_fields if name in model.__table__.c]
+
+
+class CompressionMiddleware:
+    """Brotli when the client accepts it (and brotli-asgi is installed), gzip otherwise."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_SIZE, excluded: Sequence[str] = COMPRESS_EXCLUDED):
+        self.app = app
+        self.excluded = [re.compile(p) for p in excluded]
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or any(p.search(scope["path"]) for p in self.excluded):
+            await self.app(scope, receive, send)
+        else:
+            await self.compressed(scope, receive, send)
@@ -0,0 +1,375 @@
+"""Bounded reads of uploaded project files.
+
+Uploads are copied to a temporary file chunk by chunk (never held in memory whole), and
+ZIP archives are validated from their central directory before any member is
+decompressed: member count, declared sizes and compression ratio are capped so a small
+archive cannot expand into gigabytes. Members are then parsed straight from the
+decompressing stream through a reader that enforces the size limit on the bytes actually
+produced, since the sizes declared in the archive can lie.
+
+Parsing (YAML, ZIP, n8n conversion) is CPU bound, so handlers run it through
+``run_parser``: each parse in a process of its own, at most IMPORT_PARSE_WORKERS at once.
+A parse that exceeds its timeout gets that process terminated, so a pathological document
+cannot pin a CPU indefinitely nor take other requests' parses down with it.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import UploadFile
+
+from src import yaml_io
+from .utils_n8n import convert_n8n_to_crewai, detect_n8n_integrations, is_n8n_workflow
+
+IMPORT_MAX_ARCHIVE_BYTES = int(os.getenv("IMPORT_MAX_ARCHIVE_BYTES", str(1024 * 1024 * 1024)))
+IMPORT_MAX_MEMBER_BYTES = int(os.getenv("IMPORT_MAX_MEMBER_BYTES", str(64 * 1024 * 1024)))
+IMPORT_MAX_TOTAL_BYTES = int(os.getenv("IMPORT_MAX_TOTAL_BYTES", str(2 * 1024 * 1024 * 1024)))
+IMPORT_MAX_MEMBERS = int(os.getenv("IMPORT_MAX_MEMBERS", "10000"))
+IMPORT_MAX_COMPRESSION_RATIO = float(os.getenv("IMPORT_MAX_COMPRESSION_RATIO", "100"))
+# Members below this size skip the ratio check (small repetitive files legitimately compress very well)
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+README_MAX_BYTES = 64 * 1024
+_CHUNK = 1024 * 1024
+# Parser process pool: at most IMPORT_PARSE_WORKERS parses run at once, each for at most
+# IMPORT_PARSE_TIMEOUT seconds (queued requests wait without consuming their timeout)
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "2"))
+IMPORT_PARSE_TIMEOUT = float(os.getenv("IMPORT_PARSE_TIMEOUT", "30"))
+IMPORT_BULK_TIMEOUT = float(os.getenv("IMPORT_BULK_TIMEOUT", "600"))
+# Members of a bulk archive that are imported as projects
+BULK_EXTENSIONS = (".json", ".yaml", ".yml", ".zip")
+
+
+class ImportTooLarge(ValueError):
+    """Upload or archive member exceeds a configured limit (HTTP 413)."""
+
+
+class InvalidArchive(ValueError):
+    """Upload is not a readable project archive (HTTP 400)."""
+
+
+class ParseTimeout(ValueError):
+    """Parsing took longer than IMPORT_PARSE_TIMEOUT (HTTP 422)."""
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = IMPORT_MAX_ARCHIVE_BYTES) -> Tuple[str, str]:
+    """Copy an upload to a named temporary file; returns its path (the caller removes it) and sha256."""
+    fd, path = tempfile.mkstemp(suffix=".upload")
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(_CHUNK)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise ImportTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = IMPORT_MAX_MEMBER_BYTES) -> bytes:
+    """Whole upload as bytes, refusing anything larger than ``max_bytes``."""
+    data = await upload.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ImportTooLarge(f"Upload exceeds {max_bytes} bytes")
+    return data
+
+
+class BoundedReader:
+    """File-like wrapper that fails once more than ``limit`` bytes have been read."""
+
+    def __init__(self, raw, limit: int, name: str = ""):
+        self.raw = raw
+        self.limit = limit
+        self.name = name
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        want = self.limit + 1 - self.consumed if size is None or size < 0 else size
+        data = self.raw.read(max(want, 0))
+        self.consumed += len(data)
+        if self.consumed > self.limit:
+            raise ImportTooLarge(f"{self.name or 'Member'} expands beyond {self.limit} bytes")
+        return data
+
+
+def check_archive(zf: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """Validate the central directory against the configured limits; returns the file members."""
+    infos = [i for i in zf.infolist() if not i.is_dir()]
+    if len(infos) > IMPORT_MAX_MEMBERS:
+        raise ImportTooLarge(f"Archive has more than {IMPORT_MAX_MEMBERS} members")
+    total = 0
+    for info in infos:
+        if info.file_size > IMPORT_MAX_MEMBER_BYTES:
+            raise ImportTooLarge(f"{info.filename} is larger than {IMPORT_MAX_MEMBER_BYTES} bytes")
+        if info.file_size >= RATIO_CHECK_MIN_BYTES:
+            ratio = info.file_size / max(info.compress_size, 1)
+            if ratio > IMPORT_MAX_COMPRESSION_RATIO:
+                raise ImportTooLarge(f"{info.filename} has a suspicious compression ratio ({ratio:.0f}:1)")
+        total += info.file_size
+        if total > IMPORT_MAX_TOTAL_BYTES:
+            raise ImportTooLarge(f"Archive expands beyond {IMPORT_MAX_TOTAL_BYTES} bytes")
+    return infos
+
+
+def load_yaml_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> Any:
+    """Parse a member as YAML (JSON included) while it is being decompressed."""
+    with zf.open(info) as raw:
+        try:
+            return yaml_io.load(BoundedReader(raw, IMPORT_MAX_MEMBER_BYTES, info.filename))
+        except yaml_io.YAMLError as e:
+            # Re-raised as a plain message: YAML errors carry marks that do not pickle cleanly
+            raise InvalidArchive(f"Invalid YAML in {info.filename}: {e}")
+
+
+def parse_yaml(data: bytes) -> Any:
+    """YAML (or JSON) document from bytes; runs in the parser pool."""
+    try:
+        return yaml_io.load(data)
+    except yaml_io.YAMLError as e:
+        raise InvalidArchive(str(e))
+
+
+def parse_project_document(data: bytes) -> Any:
+    """Project JSON/YAML, converting n8n workflows to the project format."""
+    parsed = parse_yaml(data)
+    if is_n8n_workflow(parsed):
+        parsed = convert_n8n_to_crewai(parsed)
+    return parsed
+
+
+def _find(infos: List[zipfile.ZipInfo], endswith: str) -> Optional[zipfile.ZipInfo]:
+    suffix = endswith.lower()
+    for info in infos:
+        if info.filename.lower().endswith(suffix):
+            return info
+    return None
+
+
+def read_project_archive(path: str) -> Dict[str, Any]:
+    """agents.yaml, tasks.yaml, optional project.json and README head of a project ZIP."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            infos = check_archive(zf)
+            agents_info = _find(infos, "agents.yaml")
+            tasks_info = _find(infos, "tasks.yaml")
+            if not agents_info or not tasks_info:
+                found = ", ".join(i.filename for i in infos[:50])
+                raise InvalidArchive(f"ZIP must contain agents.yaml and tasks.yaml (found: {found})")
+            project_info = _find(infos, "project.json")
+            readme_info = _find(infos, "readme.md")
+            readme = None
+            if readme_info:
+                with zf.open(readme_info) as raw:
+                    readme = raw.read(README_MAX_BYTES).decode("utf-8", errors="ignore")
+            return {
+                "agents": load_yaml_member(zf, agents_info),
+                "tasks": load_yaml_member(zf, tasks_info),
+                "project": (load_yaml_member(zf, project_info) if project_info else None) or {},
+                "readme": readme,
+            }
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError):
+        raise InvalidArchive("Invalid ZIP file")
+
+
+def project_from_document(data: Any) -> Dict[str, Any]:
+    """Project spec (name, description, model fields, agents, tasks) from a parsed JSON/YAML document."""
+    if not isinstance(data, dict) or "name" not in data:
+        raise InvalidArchive("Payload must contain at least 'name'")
+    spec = {k: data[k] for k in ("name", "description", "model_provider", "model_name", "language") if k in data}
+    spec["agents"] = list(data.get("agents") or [])
+    spec["tasks"] = list(data.get("tasks") or [])
+    return spec
+
+
+def _readme_description(readme_text: Optional[str]) -> Optional[str]:
+    if not readme_text:
+        return None
+    # First non-header line, else the first header's text
+    for line in readme_text.splitlines():
+        s = line.strip()
+        if s and not s.startswith('#'):
+            return s
+    for line in readme_text.splitlines():
+        s = line.strip()
+        if s.startswith('#'):
+            return s.lstrip('#').strip()
+    return None
+
+
+def project_from_archive(archive: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    """Project spec from read_project_archive output, accepting list or dict style YAML."""
+    project_json = archive["project"] if isinstance(archive["project"], dict) else {}
+    agents_yaml = archive["agents"]
+    tasks_yaml = archive["tasks"]
+    if isinstance(agents_yaml, dict):
+        agents_list = []
+        for name, data in agents_yaml.items():
+            d = dict(data or {})
+            d['name'] = name
+            agents_list.append(d)
+        agents_yaml = agents_list
+    if isinstance(tasks_yaml, dict):
+        tasks_list = []
+        for name, data in tasks_yaml.items():
+            d = dict(data or {})
+            # try to infer agent
+            if 'agent' not in d:
+                for k, v in d.items():
+                    if k.startswith('agent') and isinstance(v, str):
+                        d['agent'] = v
+                        break
+            tasks_list.append(d)
+        # CrewAI's native format names context tasks by key; store them as list positions
+        task_position = {name: i for i, name in enumerate(tasks_yaml)}
+        for d in tasks_list:
+            if isinstance(d.get('context'), list):
+                d['context'] = [task_position.get(c, c) for c in d['context']]
+        tasks_yaml = tasks_list
+
+    fallback_name = os.path.splitext(os.path.basename(filename))[0].replace('_', ' ').strip().title()
+    spec = {k: project_json[k] for k in ("model_provider", "model_name", "language") if k in project_json}
+    spec["name"] = project_json.get("name", fallback_name)
+    spec["description"] = project_json.get(
+        "description", _readme_description(archive["readme"]) or f"Imported from ZIP: {filename}"
+    )
+    spec["agents"] = list(agents_yaml or [])
+    spec["tasks"] = list(tasks_yaml or [])
+    return spec
+
+
+def parse_project_archive(path: str, filename: str) -> Dict[str, Any]:
+    return project_from_archive(read_project_archive(path), filename)
+
+
+def parse_bulk_document(item: Dict[str, Any], data: bytes) -> None:
+    """Fill a bulk item from one project or n8n workflow file, with the n8n integrations found."""
+    item["content_hash"] = hashlib.sha256(data).hexdigest()
+    document = parse_yaml(data)
+    if is_n8n_workflow(document):
+        item["integrations"] = detect_n8n_integrations(document)
+        document = convert_n8n_to_crewai(document)
+    item["project"] = project_from_document(document)
+
+
+def _bulk_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"filename": info.filename, "content_hash": None}
+    digest = hashlib.sha256()
+    try:
+        with zf.open(info) as raw:
+            reader = BoundedReader(raw, IMPORT_MAX_MEMBER_BYTES, info.filename)
+            if info.filename.lower().endswith(".zip"):
+                fd, path = tempfile.mkstemp(suffix=".zip")
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        for chunk in iter(lambda: reader.read(_CHUNK), b""):
+                            digest.update(chunk)
+                            out.write(chunk)
+                    item["content_hash"] = digest.hexdigest()
+                    item["project"] = parse_project_archive(path, os.path.basename(info.filename))
+                finally:
+                    os.remove(path)
+            else:
+                parse_bulk_document(item, reader.read())
+    except Exception as e:
+        # Reported per member; one broken project must not fail the rest of the archive
+        item["error"] = str(e) or type(e).__name__
+    return item
+
+
+def list_bulk_members(path: str) -> List[str]:
+    """Names of the project files (.json/.yaml/.yml) and project ZIPs inside an archive."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return [
+                info.filename for info in check_archive(zf)
+                if info.filename.lower().endswith(BULK_EXTENSIONS)
+                and not any(part.startswith(("__MACOSX", ".")) for part in info.filename.split("/"))
+            ]
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError):
+        raise InvalidArchive("Invalid ZIP file")
+
+
+def read_bulk_members(path: str, names: List[str]) -> List[Dict[str, Any]]:
+    """Parse the named members of an archive checked by list_bulk_members.
+
+    Returns one dict per member with its filename, sha256, n8n integrations and either the
+    project spec or an error message, so one broken member does not fail the whole import.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return [_bulk_member(zf, zf.getinfo(name)) for name in names]
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError):
+        raise InvalidArchive("Invalid ZIP file")
+
+
+def bulk_chunks(names: List[str], workers: int = IMPORT_PARSE_WORKERS) -> List[List[str]]:
+    """Split members into a few chunks per parser worker so they are converted in parallel."""
+    size = max(1, -(-len(names) // (max(workers, 1) * 4)))
+    return [names[i:i + size] for i in range(0, len(names), size)]
+
+
+_parse_slots: Optional[asyncio.Semaphore] = None
+# One single-process executor per parse in progress, so shutdown can stop them
+_parse_pools: Set[ProcessPoolExecutor] = set()
+
+
+def _terminate_pool(pool: ProcessPoolExecutor) -> None:
+    # The executor has no API to stop a busy worker; terminating the process is the only way
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _slots() -> asyncio.Semaphore:
+    global _parse_slots
+    if _parse_slots is None:
+        _parse_slots = asyncio.Semaphore(IMPORT_PARSE_WORKERS)
+    return _parse_slots
+
+
+async def run_parser(fn, *args, timeout: float = IMPORT_PARSE_TIMEOUT):
+    """Run a parse function in a process of its own, off the event loop and the API threadpool.
+
+    Processes are forked per parse rather than kept in a shared pool: on timeout (or
+    cancellation) only this parse's process is terminated, and concurrent imports keep going.
+    """
+    async with _slots():
+        pool = ProcessPoolExecutor(max_workers=1)
+        _parse_pools.add(pool)
+        try:
+            result = await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(pool, fn, *args), timeout)
+        except asyncio.TimeoutError:
+            _terminate_pool(pool)
+            raise ParseTimeout(f"Parsing took longer than {timeout:g}s")
+        except BaseException:
+            _terminate_pool(pool)
+            raise
+        finally:
+            _parse_pools.discard(pool)
+        pool.shutdown(wait=False)
+        return result
+
+
+async def parse_bulk_chunk(path: str, names: List[str], timeout: float = IMPORT_BULK_TIMEOUT) -> List[Dict[str, Any]]:
+    """read_bulk_members for one chunk; a timeout or unreadable archive fails only its members."""
+    try:
+        return await run_parser(read_bulk_members, path, names, timeout=timeout)
+    except (ParseTimeout, InvalidArchive) as e:
+        return [{"filename": name, "content_hash": None, "error": str(e)} for name in names]
+
+
+def shutdown_parse_pool() -> None:
+    for pool in list(_parse_pools):
+        _terminate_pool(pool)
+    _parse_pools.clear()
@@ -1,131 +1,259 @@
-from typing import Dict, List
+import heapq
+import re
+from typing import Dict, List, Set, Tuple
+
+
+NODE_INTEGRATIONS = {
+    "n8n-nodes-base.httpRequest": "HTTP/API Requests",
+    "n8n-nodes-base.chatOpenAi": "OpenAI API",
+    "n8n-nodes-base.chatAnthropic": "Anthropic API",
+    "@n8n/n8n-nodes-langchain.lmChatOpenAi": "OpenAI API",
+    "@n8n/n8n-nodes-langchain.lmChatAnthropic": "Anthropic API",
+    "n8n-nodes-base.googleCloudStorage": "Google Cloud Storage",
+    "n8n-nodes-base.awsS3": "AWS S3",
+    "n8n-nodes-base.discord": "Discord API",
+    "n8n-nodes-base.slack": "Slack API",
+    "n8n-nodes-base.telegram": "Telegram API",
+    "n8n-nodes-base.twitter": "Twitter API",
+    "n8n-nodes-base.github": "GitHub API",
+    "n8n-nodes-base.gitlab": "GitLab API",
+    "n8n-nodes-base.jira": "Jira API",
+    "n8n-nodes-base.notion": "Notion API",
+    "n8n-nodes-base.airtable": "Airtable API",
+    "n8n-nodes-base.googleSheets": "Google Sheets API",
+    "n8n-nodes-base.mysql": "MySQL Database",
+    "n8n-nodes-base.postgres": "PostgreSQL Database",
+    "n8n-nodes-base.mongoDb": "MongoDB Database",
+    "n8n-nodes-base.redis": "Redis Database",
+    "n8n-nodes-base.emailSend": "Email Service (SMTP)",
+    "n8n-nodes-base.sendGrid": "SendGrid API",
+    "n8n-nodes-base.twilio": "Twilio API",
+    "n8n-nodes-base.stripe": "Stripe API",
+    "n8n-nodes-base.paypal": "PayPal API",
+    "n8n-nodes-base.shopify": "Shopify API",
+    "n8n-nodes-base.wooCommerce": "WooCommerce API",
+    "n8n-nodes-base.zapier": "Zapier API",
+    "n8n-nodes-base.webhook": "Webhooks",
+    "n8n-nodes-base.scheduleTrigger": "Scheduled Triggers",
+    "n8n-nodes-base.formTrigger": "Form Triggers",
+}
+# Keywords looked up in HTTP node URLs; when several match, the first listed wins
+URL_INTEGRATIONS = [
+    ("openai", "OpenAI API"),
+    ("anthropic", "Anthropic API"),
+    ("github", "GitHub API"),
+    ("slack", "Slack API"),
+    ("discord", "Discord API"),
+    ("telegram", "Telegram API"),
+    ("stripe", "Stripe API"),
+    ("paypal", "PayPal API"),
+    ("shopify", "Shopify API"),
+    ("sendgrid", "SendGrid API"),
+    ("twilio", "Twilio API"),
+]
+_URL_KEYWORDS = re.compile("|".join(re.escape(keyword) for keyword, _ in URL_INTEGRATIONS))
+_URL_PRIORITY = {keyword: (i, name) for i, (keyword, name) in enumerate(URL_INTEGRATIONS)}
 
 
 def detect_n8n_integrations(n8n_data: Dict) -> List[str]:
+    """Services a workflow talks to, from node types and HTTP node URLs (one regex scan per URL)."""
     integrations = set()
+    for node in n8n_data.get("nodes") or []:
+        if not isinstance(node, dict):
+            continue
+        name = NODE_INTEGRATIONS.get(node.get("type", ""))
+        if name:
+            integrations.add(name)
+        params = node.get("parameters")
+        if isinstance(params, dict) and "url" in params:
+            hits = {m.group(0) for m in _URL_KEYWORDS.finditer(str(params["url"]).lower())}
+            if hits:
+                integrations.add(min(_URL_PRIORITY[h] for h in hits)[1])
+    return sorted(integrations)
+
+
+def is_n8n_workflow(data) -> bool:
+    return isinstance(data, dict) and "nodes" in data and "connections" in data
+
+
+NODE_ROLES = {
+    "n8n-nodes-base.httpRequest": "API Caller",
+    "n8n-nodes-base.chatOpenAi": "AI Assistant",
+    "n8n-nodes-base.function": "Code Executor",
+    "n8n-nodes-base.set": "Data Processor",
+    "n8n-nodes-base.if": "Decision Maker",
+    "n8n-nodes-base.wait": "Timer",
+    "n8n-nodes-base.formTrigger": "Form Handler",
+}
+# Canvas annotations, not steps of the workflow
+IGNORED_NODE_TYPES = {"n8n-nodes-base.stickyNote"}
+# Nodes that only start the workflow; they do no work of their own
+TRIGGER_NODE_TYPES = {"n8n-nodes-base.webhook", "n8n-nodes-base.start"}
+
+
+def _is_trigger(node_type: str) -> bool:
+    return node_type in TRIGGER_NODE_TYPES or node_type.endswith("Trigger")
+
+
+def _agent_for(node: Dict, fallback_name: str) -> Dict:
+    node_type = node.get("type", "")
+    node_name = node.get("name", fallback_name)
+    backstory = f"Processa dados do tipo {node_type}"
+    params = node.get("parameters") or {}
+    if "method" in params and "url" in params:
+        backstory = f"Faz requisições {params['method']} para {params['url']}"
+    elif "model" in params:
+        backstory = f"Usa modelo de IA {params.get('model', 'desconhecido')}"
+    return {
+        "name": node_name,
+        "role": NODE_ROLES.get(node_type, "Task Executor"),
+        "goal": f"Executar a funcionalidade do node '{node_name}'",
+        "backstory": backstory,
+        "tools": [],
+        "verbose": True,
+        "memory": False,
+        "allow_delegation": False,
+    }
+
+
+def build_n8n_graph(n8n_data: Dict) -> Tuple[List[Dict], List[Set[int]], List[Set[int]]]:
+    """Workflow nodes with deduplicated ``main`` edges as successor/predecessor sets.
 
-    for node in n8n_data.get("nodes", []):
-        node_type = node.get("type", "")
-        integration_mapping = {
-            "n8n-nodes-base.httpRequest": "HTTP/API Requests",
-            "n8n-nodes-base.chatOpenAi": "OpenAI API",
-            "n8n-nodes-base.chatAnthropic": "Anthropic API",
-            "n8n-nodes-base.googleCloudStorage": "Google Cloud Storage",
-            "n8n-nodes-base.awsS3": "AWS S3",
-            "n8n-nodes-base.discord": "Discord API",
-            "n8n-nodes-base.slack": "Slack API",
-            "n8n-nodes-base.telegram": "Telegram API",
-            "n8n-nodes-base.twitter": "Twitter API",
-            "n8n-nodes-base.github": "GitHub API",
-            "n8n-nodes-base.gitlab": "GitLab API",
-            "n8n-nodes-base.jira": "Jira API",
-            "n8n-nodes-base.notion": "Notion API",
-            "n8n-nodes-base.airtable": "Airtable API",
-            "n8n-nodes-base.googleSheets": "Google Sheets API",
-            "n8n-nodes-base.mysql": "MySQL Database",
-            "n8n-nodes-base.postgres": "PostgreSQL Database",
-            "n8n-nodes-base.mongoDb": "MongoDB Database",
-            "n8n-nodes-base.redis": "Redis Database",
-            "n8n-nodes-base.emailSend": "Email Service (SMTP)",
-            "n8n-nodes-base.sendGrid": "SendGrid API",
-            "n8n-nodes-base.twilio": "Twilio API",
-            "n8n-nodes-base.stripe": "Stripe API",
-            "n8n-nodes-base.paypal": "PayPal API",
-            "n8n-nodes-base.shopify": "Shopify API",
-            "n8n-nodes-base.wooCommerce": "WooCommerce API",
-            "n8n-nodes-base.zapier": "Zapier API",
-            "n8n-nodes-base.webhook": "Webhooks",
-            "n8n-nodes-base.scheduleTrigger": "Scheduled Triggers",
-            "n8n-nodes-base.formTrigger": "Form Triggers",
-        }
-
-        if node_type in integration_mapping:
-            integrations.add(integration_mapping[node_type])
-
-        if "parameters" in node:
-            params = node["parameters"]
-            if "url" in params:
-                url = str(params["url"]).lower()
-                if "openai" in url or "api.openai.com" in url:
-                    integrations.add("OpenAI API")
-                elif "anthropic" in url or "api.anthropic.com" in url:
-                    integrations.add("Anthropic API")
-                elif "github" in url or "api.github.com" in url:
-                    integrations.add("GitHub API")
-                elif "slack" in url or "hooks.slack.com" in url:
-                    integrations.add("Slack API")
-                elif "discord" in url or "discord.com" in url:
-                    integrations.add("Discord API")
-                elif "telegram" in url or "api.telegram.org" in url:
-                    integrations.add("Telegram API")
-                elif "stripe" in url or "api.stripe.com" in url:
-                    integrations.add("Stripe API")
-                elif "paypal" in url:
-                    integrations.add("PayPal API")
-                elif "shopify" in url:
-                    integrations.add("Shopify API")
-                elif "sendgrid" in url or "api.sendgrid.com" in url:
-                    integrations.add("SendGrid API")
-                elif "twilio" in url or "api.twilio.com" in url:
-                    integrations.add("Twilio API")
-
-    return sorted(list(integrations))
+    Sticky notes are dropped, disabled nodes are bypassed (n8n passes their input through)
+    and self-loops and edges to unknown nodes are ignored. Sub-nodes linked only through
+    ``ai_languageModel``/``ai_tool``/... connections are not steps and are left out.
+    """
+    connections = n8n_data.get("connections") or {}
+    # Sub-nodes (chat models, memories, tools) only feed their parent through ai_* links
+    sub_nodes = {
+        source for source, outputs in connections.items()
+        if isinstance(outputs, dict)
+        and any(kind != "main" and links for kind, links in outputs.items())
+        and not any(outputs.get("main") or [])
+    }
+    nodes: List[Dict] = []
+    index: Dict[str, int] = {}
+    for node in n8n_data.get("nodes") or []:
+        if not isinstance(node, dict) or node.get("type") in IGNORED_NODE_TYPES:
+            continue
+        name = node.get("name") or f"Node {len(nodes) + 1}"
+        if name not in index and name not in sub_nodes:
+            index[name] = len(nodes)
+            nodes.append({**node, "name": name})
+
+    succ: List[Set[int]] = [set() for _ in nodes]
+    pred: List[Set[int]] = [set() for _ in nodes]
+    for source, outputs in connections.items():
+        src = index.get(source)
+        if src is None or not isinstance(outputs, dict):
+            continue
+        for branch in outputs.get("main") or []:
+            for connection in branch or []:
+                dst = index.get((connection or {}).get("node"))
+                if dst is not None and dst != src:
+                    succ[src].add(dst)
+                    pred[dst].add(src)
+
+    for i, node in enumerate(nodes):
+        if node.get("disabled"):
+            for p in pred[i]:
+                succ[p].discard(i)
+                succ[p].update(s for s in succ[i] if s != p)
+            for s in succ[i]:
+                pred[s].discard(i)
+                pred[s].update(p for p in pred[i] if p != s)
+            pred[i], succ[i] = set(), set()
+    return nodes, succ, pred
+
+
+def back_edges(succ: List[Set[int]], pred: List[Set[int]]) -> Set[Tuple[int, int]]:
+    """Edges closing a cycle (loops such as SplitInBatches feeding back), found by a
+    depth-first walk from the entry nodes in node order."""
+    state = [0] * len(succ)  # 0 unseen, 1 on the current path, 2 finished
+    found: Set[Tuple[int, int]] = set()
+    roots = [i for i in range(len(succ)) if not pred[i]] + list(range(len(succ)))
+    for root in roots:
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(sorted(succ[root])))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state[child] == 1:
+                    found.add((node, child))
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(sorted(succ[child]))))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return found
+
+
+def topological_order(succ: List[Set[int]], pred: List[Set[int]], skip: Set[Tuple[int, int]]) -> List[int]:
+    """Kahn's algorithm over the edges not in ``skip``, ties broken by node position."""
+    indegree = [sum(1 for p in pred[i] if (p, i) not in skip) for i in range(len(pred))]
+    ready = [i for i, d in enumerate(indegree) if d == 0]
+    heapq.heapify(ready)
+    order: List[int] = []
+    while ready:
+        node = heapq.heappop(ready)
+        order.append(node)
+        for child in succ[node]:
+            if (node, child) not in skip:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    heapq.heappush(ready, child)
+    return order
 
 
 def convert_n8n_to_crewai(n8n_data: Dict) -> Dict:
+    """One agent and one task per workflow step, keeping n8n's topology.
+
+    Tasks are ordered by depth in the graph (longest path from the triggers) and each one
+    gets its direct upstream steps as ``context`` (positions in the task list). Steps at
+    the same depth are independent branches: all but the last of each depth run with
+    ``async_execution`` and the last one, synchronous, makes CrewAI wait for the whole
+    depth before the next one starts.
+    """
     project_name = n8n_data.get("name", "Workflow Importado")
+    nodes, succ, pred = build_n8n_graph(n8n_data)
+    loops = back_edges(succ, pred)
+    order = topological_order(succ, pred, loops)
+    position_in_order = {node: i for i, node in enumerate(order)}
 
-    agents = []
-    tasks = []
+    is_step = [not (node.get("disabled") or _is_trigger(node.get("type", ""))) for node in nodes]
+    depth = [0] * len(nodes)
+    upstream: List[List[int]] = [[] for _ in nodes]
+    for node in order:
+        upstream[node] = sorted((p for p in pred[node] if (p, node) not in loops), key=position_in_order.get)
+        depth[node] = max((depth[p] + 1 for p in upstream[node] if is_step[p]), default=0)
 
-    node_type_mapping = {
-        "n8n-nodes-base.httpRequest": "API Caller",
-        "n8n-nodes-base.chatOpenAi": "AI Assistant",
-        "n8n-nodes-base.function": "Code Executor",
-        "n8n-nodes-base.set": "Data Processor",
-        "n8n-nodes-base.if": "Decision Maker",
-        "n8n-nodes-base.wait": "Timer",
-        "n8n-nodes-base.formTrigger": "Form Handler",
-    }
+    steps = sorted((n for n in order if is_step[n]), key=lambda n: (depth[n], position_in_order[n]))
+    task_position = {node: i for i, node in enumerate(steps)}
 
-    for i, node in enumerate(n8n_data.get("nodes", [])):
-        node_type = node.get("type", "")
-        node_name = node.get("name", f"Node {i+1}")
-        role = node_type_mapping.get(node_type, "Task Executor")
-        backstory = f"Processa dados do tipo {node_type}"
-        if "parameters" in node:
-            params = node["parameters"]
-            if "method" in params and "url" in params:
-                backstory = f"Faz requisições {params['method']} para {params['url']}"
-            elif "model" in params:
-                backstory = f"Usa modelo de IA {params.get('model', 'desconhecido')}"
-
-        agent = {
-            "name": node_name,
-            "role": role,
-            "goal": f"Executar a funcionalidade do node '{node_name}'",
-            "backstory": backstory,
+    agents = []
+    tasks = []
+    for i, node in enumerate(steps):
+        name = nodes[node]["name"]
+        agents.append(_agent_for(nodes[node], name))
+        sources = [nodes[p]["name"] for p in upstream[node]]
+        if sources:
+            description = "Processar dados vindos de " + ", ".join(f"'{s}'" for s in sources)
+        else:
+            description = f"Executar a etapa inicial '{name}'"
+        next_same_depth = i + 1 < len(steps) and depth[steps[i + 1]] == depth[node]
+        tasks.append({
+            "agent": name,
+            "description": description,
+            "expected_output": f"Resultado do processamento do node '{name}'",
             "tools": [],
-            "verbose": True,
-            "memory": False,
-            "allow_delegation": False,
-        }
-        agents.append(agent)
-
-    connections = n8n_data.get("connections", {})
-    for source_node, connection_data in connections.items():
-        for connection_list in connection_data.get("main", []):
-            for connection in connection_list:
-                target_node = connection.get("node")
-                task = {
-                    "agent": target_node,
-                    "description": f"Processar dados vindos de '{source_node}'",
-                    "expected_output": f"Resultado do processamento do node '{target_node}'",
-                    "tools": [],
-                    "async_execution": False,
-                    "output_file": "",
-                }
-                tasks.append(task)
+            "async_execution": next_same_depth,
+            "output_file": "",
+            "context": [task_position[p] for p in upstream[node] if p in task_position],
+        })
 
     return {
         "name": project_name,
@@ -135,4 +263,3 @@ def convert_n8n_to_crewai(n8n_data: Dict) -> Dict:
         "agents": agents,
         "tasks": tasks,
     }
-
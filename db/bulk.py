@@ -0,0 +1,16 @@
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+
+def insert_returning_ids(db: Session, model, rows: Sequence[Dict[str, Any]]) -> List[int]:
+    """Bulk INSERT ``rows`` and return the new primary keys in the order of ``rows``."""
+    if not rows:
+        return []
+    stmt = insert(model)
+    if db.get_bind().dialect.name == "sqlite":
+        # No sentinel support: sort_by_parameter_order would fall back to one INSERT per row.
+        # Rowids of a multi-row INSERT are assigned in VALUES order, so sorting restores it.
+        return sorted(db.scalars(stmt.returning(model.id), rows).all())
+    return list(db.scalars(stmt.returning(model.id, sort_by_parameter_order=True), rows).all())
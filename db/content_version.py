@@ -0,0 +1,91 @@
+"""Per-project content version maintained by database triggers.
+
+``projects.content_version`` is bumped whenever the project's own fields, or any of its
+agents or tasks, are inserted, updated or deleted - through the ORM, bulk statements or
+raw SQL alike. Caches of derived project data (similarity index, exports, compiled crews)
+compare it to decide whether an entry is still valid.
+
+SQLite hands the id of a deleted project out again, so those caches also compare
+``created_stamp`` (the creation time, which the model records to the microsecond) to tell
+a new project from an older one that had the same id.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PROJECT_FIELDS = ("name", "description", "model_provider", "model_name", "language")
+CHILD_TABLES = ("agents", "tasks")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def created_stamp(created_at: Optional[datetime]) -> int:
+    """``projects.created_at`` as microseconds since the epoch (naive values are UTC)."""
+    if created_at is None:
+        return 0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (created_at - _EPOCH) // timedelta(microseconds=1)
+
+
+def _create_sqlite(conn: Connection) -> None:
+    fields = ", ".join(PROJECT_FIELDS)
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS content_version_projects_au AFTER UPDATE OF {fields} ON projects "
+        "BEGIN UPDATE projects SET content_version = content_version + 1 WHERE id = NEW.id; END"
+    ))
+    bump = "UPDATE projects SET content_version = content_version + 1 WHERE id = {row}.project_id;"
+    for table in CHILD_TABLES:
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS content_version_{table}_ai AFTER INSERT ON {table} "
+            f"BEGIN {bump.format(row='NEW')} END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS content_version_{table}_au AFTER UPDATE ON {table} "
+            f"BEGIN {bump.format(row='OLD')} {bump.format(row='NEW')} END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS content_version_{table}_ad AFTER DELETE ON {table} "
+            f"BEGIN {bump.format(row='OLD')} END"
+        ))
+
+
+def _create_postgres(conn: Connection) -> None:
+    conn.execute(text("""
+CREATE OR REPLACE FUNCTION content_version_project() RETURNS trigger AS $$
+BEGIN
+    NEW.content_version := OLD.content_version + 1;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql"""))
+    conn.execute(text("DROP TRIGGER IF EXISTS content_version_projects ON projects"))
+    conn.execute(text(
+        f"CREATE TRIGGER content_version_projects BEFORE UPDATE OF {', '.join(PROJECT_FIELDS)} ON projects "
+        "FOR EACH ROW EXECUTE FUNCTION content_version_project()"
+    ))
+    conn.execute(text("""
+CREATE OR REPLACE FUNCTION content_version_child() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE projects SET content_version = content_version + 1 WHERE id = OLD.project_id;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.project_id <> OLD.project_id) THEN
+        UPDATE projects SET content_version = content_version + 1 WHERE id = NEW.project_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql"""))
+    for table in CHILD_TABLES:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS content_version_{table} ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER content_version_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION content_version_child()"
+        ))
+
+
+def create_content_version_triggers(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        _create_postgres(conn)
+    else:
+        _create_sqlite(conn)
@@ -1,5 +1,8 @@
 import os
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -8,6 +11,93 @@ load_dotenv()
 # Use SQLite for local development if PostgreSQL is not available
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./crew_ai_studio.db")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def engine_options(url: str) -> dict:
+    """Dialect specific create_engine() keyword arguments, tunable through env vars."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options = {"pool_pre_ping": True}
+    if backend == "postgresql":
+        options.update(
+            pool_size=_env_int("DB_POOL_SIZE", 10),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 20),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        )
+        statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+        if statement_timeout and parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+        elif statement_timeout:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """WAL journal, busy timeout and synchronous=NORMAL on every new SQLite connection.
+
+    WAL lets API reads proceed while the background executor appends logs, and the busy
+    timeout makes concurrent writers wait instead of failing with "database is locked".
+    """
+    database = engine.url.database
+    in_memory = not database or database == ":memory:" or database.startswith("file::memory:")
+    busy_timeout = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL) -> Engine:
+    eng = create_engine(url, **engine_options(url))
+    if eng.dialect.name == "sqlite":
+        configure_sqlite(eng)
+    return eng
+
+
+def async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its asyncio driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+
+def build_async_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    aurl = async_url(url)
+    eng = create_async_engine(aurl, **engine_options(aurl))
+    if eng.dialect.name == "sqlite":
+        configure_sqlite(eng.sync_engine)
+    return eng
+
+
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
+
+# The async engine is created on first use so the aiosqlite/asyncpg drivers are only
+# needed by processes that actually serve the async endpoints.
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        _async_engine = build_async_engine(DATABASE_URL)
+        _async_session_factory = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
@@ -0,0 +1,204 @@
+"""Versioned schema migrations that run on both SQLite and PostgreSQL.
+
+Each migration is a function registered with ``@migration(version, description)``.
+Applied versions are recorded in ``schema_migrations`` so every migration runs
+exactly once per database. Usage::
+
+    python -m db.migrations          # apply pending migrations
+    python -m db.migrations status   # list applied/pending versions
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base, engine as default_engine
+from . import models
+from .content_version import create_content_version_triggers
+from .search_index import create_search_index
+
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    def register(fn: Callable[[Connection], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _create_index(conn: Connection, table: Table, name: str) -> None:
+    # Indexes are declared on the models so create_all() builds them on fresh databases;
+    # migrations only backfill them on databases created before the declaration.
+    index = next(i for i in table.indexes if i.name == name)
+    index.create(bind=conn, checkfirst=True)
+
+
+# ===== Migrations =====
+
+@migration(1, "Add projects.language")
+def _add_project_language(conn: Connection) -> None:
+    if not _has_column(conn, "projects", "language"):
+        conn.execute(text("ALTER TABLE projects ADD COLUMN language VARCHAR(10) DEFAULT 'pt'"))
+
+
+@migration(2, "Index foreign keys used by the routers")
+def _index_foreign_keys(conn: Connection) -> None:
+    _create_index(conn, models.Agent.__table__, "ix_agents_project_id")
+    _create_index(conn, models.Task.__table__, "ix_tasks_project_id")
+    _create_index(conn, models.Task.__table__, "ix_tasks_agent_id")
+
+
+@migration(3, "Composite (project_id, id DESC) index on executions")
+def _index_executions(conn: Connection) -> None:
+    # Leading project_id column also serves plain "WHERE project_id = ?" filters
+    _create_index(conn, models.Execution.__table__, "ix_executions_project_id_id")
+
+
+@migration(4, "settings_versions row for cross-worker settings cache invalidation")
+def _settings_version(conn: Connection) -> None:
+    table = models.SettingsVersion.__table__
+    table.create(bind=conn, checkfirst=True)
+    if conn.scalar(select(table.c.id).where(table.c.id == 1)) is None:
+        conn.execute(insert(table).values(id=1, version=0))
+
+
+@migration(5, "Add users.token_version")
+def _add_user_token_version(conn: Connection) -> None:
+    if not _has_column(conn, "users", "token_version"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+
+@migration(6, "Billing columns on users")
+def _add_user_billing(conn: Connection) -> None:
+    columns = {
+        "stripe_customer_id": "VARCHAR(255)",
+        "stripe_subscription_id": "VARCHAR(255)",
+        "subscription_status": "VARCHAR(30)",
+        "subscription_plan": "VARCHAR(200)",
+        "subscription_period_end": "INTEGER",
+        "subscription_cancel_at_period_end": "BOOLEAN DEFAULT FALSE",
+        "subscription_event_at": "INTEGER",
+    }
+    for name, ddl in columns.items():
+        if not _has_column(conn, "users", name):
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {name} {ddl}"))
+    _create_index(conn, models.User.__table__, "ix_users_stripe_customer_id")
+
+
+@migration(7, "executions.finished_at and execution_rollups")
+def _execution_rollups(conn: Connection) -> None:
+    if not _has_column(conn, "executions", "finished_at"):
+        ddl = conn.dialect.type_compiler.process(models.Execution.__table__.c.finished_at.type)
+        conn.execute(text(f"ALTER TABLE executions ADD COLUMN finished_at {ddl}"))
+    models.ExecutionRollup.__table__.create(bind=conn, checkfirst=True)
+
+
+@migration(8, "Full-text search index over agents, tasks and execution results")
+def _search_index(conn: Connection) -> None:
+    create_search_index(conn)
+
+
+@migration(9, "projects.content_version maintained by triggers")
+def _content_version(conn: Connection) -> None:
+    if not _has_column(conn, "projects", "content_version"):
+        conn.execute(text("ALTER TABLE projects ADD COLUMN content_version INTEGER NOT NULL DEFAULT 0"))
+    create_content_version_triggers(conn)
+
+
+@migration(10, "import_artifacts content-hash table")
+def _import_artifacts(conn: Connection) -> None:
+    models.ImportArtifact.__table__.create(bind=conn, checkfirst=True)
+
+
+@migration(11, "tasks.context")
+def _task_context(conn: Connection) -> None:
+    if not _has_column(conn, "tasks", "context"):
+        ddl = conn.dialect.type_compiler.process(models.Task.__table__.c.context.type)
+        conn.execute(text(f"ALTER TABLE tasks ADD COLUMN context {ddl}"))
+        conn.execute(text("UPDATE tasks SET context = '[]'"))
+
+
+@migration(12, "executions.flight_key and idempotency_keys")
+def _execution_idempotency(conn: Connection) -> None:
+    table = models.Execution.__table__
+    if not _has_column(conn, "executions", "flight_key"):
+        ddl = conn.dialect.type_compiler.process(table.c.flight_key.type)
+        conn.execute(text(f"ALTER TABLE executions ADD COLUMN flight_key {ddl}"))
+    _create_index(conn, table, "ix_executions_flight_key")
+    models.IdempotencyKey.__table__.create(bind=conn, checkfirst=True)
+
+
+@migration(13, "executions.runner and executions.heartbeat_at")
+def _execution_leases(conn: Connection) -> None:
+    table = models.Execution.__table__
+    for name in ("runner", "heartbeat_at"):
+        if not _has_column(conn, "executions", name):
+            ddl = conn.dialect.type_compiler.process(table.c[name].type)
+            conn.execute(text(f"ALTER TABLE executions ADD COLUMN {name} {ddl}"))
+
+
+# ===== Runner =====
+
+def applied_versions(bind: Optional[Engine] = None) -> List[int]:
+    bind = bind or default_engine
+    _meta.create_all(bind=bind)
+    with bind.connect() as conn:
+        return list(conn.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+
+def run_migrations(bind: Optional[Engine] = None) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction. Returns the versions applied."""
+    bind = bind or default_engine
+    done = set(applied_versions(bind))
+    applied = []
+    for m in MIGRATIONS:
+        if m.version in done:
+            continue
+        with bind.begin() as conn:
+            m.apply(conn)
+            conn.execute(insert(schema_migrations).values(version=m.version, description=m.description))
+        applied.append(m.version)
+    return applied
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        done = set(applied_versions())
+        for m in MIGRATIONS:
+            mark = "x" if m.version in done else " "
+            print(f"[{mark}] {m.version:04d} {m.description}")
+    else:
+        Base.metadata.create_all(bind=default_engine)
+        versions = run_migrations()
+        print(f"✅ Applied migrations: {versions}" if versions else "✅ Database is up to date.")
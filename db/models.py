@@ -1,5 +1,6 @@
+from datetime import datetime, timezone
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, ForeignKey, JSON, DateTime, func
+    Column, Integer, String, Text, Boolean, ForeignKey, JSON, DateTime, Index, func
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -9,7 +10,16 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bump to revoke issued tokens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Billing state mirrored from Stripe webhooks
+    stripe_customer_id = Column(String(255), unique=True, index=True)
+    stripe_subscription_id = Column(String(255))
+    subscription_status = Column(String(30))  # active|trialing|past_due|canceled|...
+    subscription_plan = Column(String(200))
+    subscription_period_end = Column(Integer)  # unix timestamp, as sent by Stripe
+    subscription_cancel_at_period_end = Column(Boolean, default=False)
+    subscription_event_at = Column(Integer)  # created timestamp of the last applied event
 
 class Project(Base):
     __tablename__ = "projects"
@@ -19,17 +29,21 @@ class Project(Base):
     model_provider = Column(String(50), default="openrouter")  # openrouter|gemini
     model_name = Column(String(100), default="openrouter/gpt-4o-mini")
     language = Column(String(10), default="pt")  # pt|en|es|fr
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by database triggers on any change to the project, its agents or tasks
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set client-side for microsecond precision: caches tell reused ids apart by it
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     agents = relationship("Agent", back_populates="project", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     executions = relationship("Execution", back_populates="project", cascade="all, delete-orphan")
+    import_artifacts = relationship("ImportArtifact", back_populates="project", cascade="all, delete-orphan")
 
 class Agent(Base):
     __tablename__ = "agents"
     id = Column(Integer, primary_key=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     name = Column(String(120), nullable=False)
     role = Column(String(200), nullable=False)
     goal = Column(Text, nullable=False)
@@ -45,13 +59,15 @@ class Agent(Base):
 class Task(Base):
     __tablename__ = "tasks"
     id = Column(Integer, primary_key=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False, index=True)
     description = Column(Text, nullable=False)
     expected_output = Column(Text, default="")
     tools = Column(JSON, default=list)
     async_execution = Column(Boolean, default=False)
     output_file = Column(String(255), default="")
+    # Ids of earlier tasks of the project whose output is passed to this one
+    context = Column(JSON, default=list)
 
     project = relationship("Project", back_populates="tasks")
     agent = relationship("Agent", back_populates="tasks")
@@ -65,8 +81,31 @@ class Execution(Base):
     output_payload = Column(JSON, default=dict)
     logs = Column(Text, default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    # Set while the run is in flight with EXECUTE_SINGLE_FLIGHT on; identical requests attach to it
+    flight_key = Column(String(64))
+    # API process that queued the run, and its last lease renewal; expired leases are failed
+    runner = Column(String(64))
+    heartbeat_at = Column(DateTime(timezone=True))
 
     project = relationship("Project", back_populates="executions")
+    idempotency_keys = relationship("IdempotencyKey", back_populates="execution", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves both "WHERE project_id = ?" and "ORDER BY id DESC" listings
+        Index("ix_executions_project_id_id", "project_id", id.desc()),
+        Index("ix_executions_flight_key", "flight_key", unique=True),
+    )
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    key = Column(String(200), primary_key=True)  # Idempotency-Key header of an execute request
+    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False, index=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the target, inputs and language
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    execution = relationship("Execution", back_populates="idempotency_keys")
 
 class Settings(Base):
     __tablename__ = "settings"
@@ -75,3 +114,37 @@ class Settings(Base):
     value = Column(Text, default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Execution counters per project, time period and duration bucket (see src/analytics.py).
+# Each run is added to an hourly row and a daily row; long ranges read the daily ones.
+# No foreign key on purpose: global history survives project deletion.
+class ExecutionRollup(Base):
+    __tablename__ = "execution_rollups"
+    project_id = Column(Integer, primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # period length in hours: 1 or 24
+    period = Column(Integer, primary_key=True)  # hours since the Unix epoch (UTC) // resolution
+    bucket = Column(Integer, primary_key=True)  # log-scale duration bucket
+    runs = Column(Integer, nullable=False, default=0)
+    successes = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    duration_ms_sum = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_execution_rollups_resolution_period", "resolution", "period"),
+    )
+
+# Single-row counter bumped on every settings write; workers compare it to refresh their cache
+class SettingsVersion(Base):
+    __tablename__ = "settings_versions"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Content hash of every file imported as a project; re-importing the same bytes returns that project
+class ImportArtifact(Base):
+    __tablename__ = "import_artifacts"
+    content_hash = Column(String(64), primary_key=True)  # sha256 hex of the uploaded file
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    filename = Column(String(255), default="")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    project = relationship("Project", back_populates="import_artifacts")
@@ -0,0 +1,161 @@
+"""Full-text index over agents, tasks and execution results.
+
+SQLite uses an FTS5 table, PostgreSQL a table with a generated ``tsvector`` column and a
+GIN index. In both cases database triggers keep the index in sync, so every write path
+(ORM, bulk statements, imports) updates it incrementally. Each indexed row gets the
+document id ``ref_id * 4 + kind code``, which keeps trigger deletes on the primary key.
+"""
+import html
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+KIND_CODES = {"agent": 1, "task": 2, "execution": 3}
+# Highlight delimiters the database wraps matches in; turned into <mark> after escaping
+_START, _STOP = "\x02", "\x03"
+
+# (kind, table, title expression, body expression, column list that triggers a reindex)
+_SOURCES = {
+    "sqlite": [
+        ("agent", "agents", "{r}.name",
+         "{r}.role || ' ' || {r}.goal || ' ' || coalesce({r}.backstory, '')", ""),
+        ("task", "tasks", "substr({r}.description, 1, 120)",
+         "{r}.description || ' ' || coalesce({r}.expected_output, '')", ""),
+        ("execution", "executions", "'Execution #' || {r}.id",
+         "coalesce(json_extract({r}.output_payload, '$.result'), '')", "OF output_payload "),
+    ],
+    "postgresql": [
+        ("agent", "agents", "{r}.name",
+         "concat_ws(' ', {r}.role, {r}.goal, {r}.backstory)", ""),
+        ("task", "tasks", "left({r}.description, 120)",
+         "concat_ws(' ', {r}.description, {r}.expected_output)", ""),
+        ("execution", "executions", "'Execution #' || {r}.id",
+         "coalesce({r}.output_payload->>'result', '')", "OF output_payload "),
+    ],
+}
+
+
+def fts5_available(conn: Connection) -> bool:
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)"))
+        conn.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _create_sqlite(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    for kind, table, title, body, update_of in _SOURCES["sqlite"]:
+        code = KIND_CODES[kind]
+        insert = (
+            "INSERT INTO search_index(rowid, kind, ref_id, project_id, title, body) "
+            f"VALUES (NEW.id * 4 + {code}, '{kind}', NEW.id, NEW.project_id, "
+            f"{title.format(r='NEW')}, {body.format(r='NEW')});"
+        )
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.id * 4 + {code};"
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS search_{table}_ai AFTER INSERT ON {table} BEGIN {insert} END"))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_au AFTER UPDATE {update_of}ON {table} BEGIN {delete} {insert} END"
+        ))
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS search_{table}_ad AFTER DELETE ON {table} BEGIN {delete} END"))
+        conn.execute(text(
+            "INSERT INTO search_index(rowid, kind, ref_id, project_id, title, body) "
+            f"SELECT r.id * 4 + {code}, '{kind}', r.id, r.project_id, {title.format(r='r')}, {body.format(r='r')} "
+            f"FROM {table} r"
+        ))
+
+
+def _create_postgres(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS search_documents ("
+        "doc_id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL, "
+        "project_id INTEGER NOT NULL, title TEXT, body TEXT, "
+        "tsv tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)"))
+    for kind, table, title, body, update_of in _SOURCES["postgresql"]:
+        code = KIND_CODES[kind]
+        conn.execute(text(f"""
+CREATE OR REPLACE FUNCTION search_sync_{table}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM search_documents WHERE doc_id = OLD.id * 4 + {code};
+        RETURN OLD;
+    END IF;
+    INSERT INTO search_documents (doc_id, kind, ref_id, project_id, title, body)
+    VALUES (NEW.id * 4 + {code}, '{kind}', NEW.id, NEW.project_id, {title.format(r='NEW')}, {body.format(r='NEW')})
+    ON CONFLICT (doc_id) DO UPDATE
+        SET project_id = EXCLUDED.project_id, title = EXCLUDED.title, body = EXCLUDED.body;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql"""))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS search_{table} ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER search_{table} AFTER INSERT OR UPDATE {update_of}OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION search_sync_{table}()"
+        ))
+        conn.execute(text(
+            "INSERT INTO search_documents (doc_id, kind, ref_id, project_id, title, body) "
+            f"SELECT r.id * 4 + {code}, '{kind}', r.id, r.project_id, {title.format(r='r')}, {body.format(r='r')} "
+            f"FROM {table} r ON CONFLICT (doc_id) DO NOTHING"
+        ))
+
+
+def create_search_index(conn: Connection) -> bool:
+    """Create the index, its triggers and backfill existing rows. Returns False if unsupported."""
+    if conn.dialect.name == "postgresql":
+        _create_postgres(conn)
+        return True
+    if conn.dialect.name == "sqlite" and fts5_available(conn):
+        _create_sqlite(conn)
+        return True
+    return False
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 expression: every word required, last one as prefix."""
+    words = re.findall(r"\w+", q, flags=re.UNICODE)
+    if not words:
+        return None
+    terms: List[str] = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_statement(dialect: str, project_id: Optional[int], kind: Optional[str]):
+    """Ranked search SQL with highlighted snippets; bind :q and :limit."""
+    filters = ""
+    if project_id is not None:
+        filters += " AND project_id = :project_id"
+    if kind is not None:
+        filters += " AND kind = :kind"
+    if dialect == "postgresql":
+        return text(
+            "SELECT kind, ref_id, project_id, title, "
+            "ts_headline('simple', coalesce(body, ''), query, "
+            f"'StartSel={_START}, StopSel={_STOP}, MaxWords=24, MinWords=8') AS snippet, "
+            "ts_rank(tsv, query) AS score "
+            "FROM search_documents, websearch_to_tsquery('simple', :q) AS query "
+            f"WHERE tsv @@ query{filters} ORDER BY score DESC LIMIT :limit"
+        )
+    return text(
+        "SELECT kind, ref_id, project_id, title, "
+        f"snippet(search_index, 4, '{_START}', '{_STOP}', '…', 16) AS snippet, "
+        "-bm25(search_index, 0, 0, 0, 5.0, 1.0) AS score "
+        f"FROM search_index WHERE search_index MATCH :q{filters} ORDER BY score DESC LIMIT :limit"
+    )
+
+
+def snippet_html(snippet: Optional[str]) -> str:
+    """HTML for a snippet from ``search_statement``: indexed text escaped, matches in <mark>."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_START, "<mark>").replace(_STOP, "</mark>")
@@ -1,8 +1,10 @@
 from .database import Base, engine, SessionLocal
 from . import models
+from .migrations import run_migrations
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 def migrate_language_data():
     """Migrate old 'pt' language to 'pt-br' in existing projects"""
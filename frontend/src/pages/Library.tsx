@@ -44,6 +44,7 @@ import { ScrollArea } from '@/components/ui/scroll-area';
 import { useToast } from '@/hooks/use-toast';
 import { useLocation, useNavigate } from 'react-router-dom';
 import { apiClient, queryKeys } from '@/lib/api';
+import { pollExecutionCompletion } from '@/utils/executionPolling';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 
 const categories = [
@@ -300,12 +301,8 @@ export default function Library() {
         language: 'pt'
       });
 
-      // Poll for completion if status is running
-      if (execution.status === 'running') {
-        return await pollExecutionCompletion(execution.id);
-      }
-      
-      return execution;
+      // Poll until the execution leaves the queue and finishes
+      return await pollExecutionCompletion(execution);
     },
     onSuccess: (data) => {
       setExecutionResult(data);
@@ -331,32 +328,6 @@ export default function Library() {
     },
   });
 
-  // Function to poll execution completion
-  const pollExecutionCompletion = async (executionId: number): Promise<any> => {
-    const maxAttempts = 30; // 30 attempts = 30 seconds max
-    let attempts = 0;
-    
-    while (attempts < maxAttempts) {
-      try {
-        const execution = await apiClient.getExecution(executionId);
-        
-        if (execution.status === 'completed' || execution.status === 'failed') {
-          return execution;
-        }
-        
-        // Wait 1 second before next poll
-        await new Promise(resolve => setTimeout(resolve, 1000));
-        attempts++;
-      } catch (error) {
-        console.error('Error polling execution:', error);
-        attempts++;
-        await new Promise(resolve => setTimeout(resolve, 1000));
-      }
-    }
-    
-    throw new Error('Execução não foi concluída no tempo esperado');
-  };
-
   // Function to create workflow from template
   const createWorkflowFromTemplate = async (templateId: string, projectId: number) => {
     const template = templates.find(t => t.id === templateId);
@@ -10,7 +10,7 @@ import { Alert, AlertDescription } from '@/components/ui/alert';
 import { Play, Square, Activity, FileText, Download, XCircle, Settings, Zap } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
 import { apiClient, queryKeys } from '@/lib/api';
-import type { Execution, ExecutionStatus } from '@/types/execution';
+import { isExecutionActive, type Execution, type ExecutionStatus } from '@/types/execution';
 import type { Agent as AgentType } from '@/types/agent';
 import type { Task as TaskType } from '@/types/task';
 import { useQuery, useQueryClient } from '@tanstack/react-query';
@@ -142,7 +142,7 @@ export default function Run() {
       case 'completed': return <Badge className="bg-accent-green text-white">Concluído</Badge>;
       case 'error': return <Badge variant="destructive">Erro</Badge>;
       case 'running': return <Badge variant="outline">Em execução</Badge>;
-      case 'created': return <Badge variant="secondary">Criado</Badge>;
+      case 'created': return <Badge variant="secondary">{currentExecution?.queue_position ? `Na fila (${currentExecution.queue_position}º)` : 'Criado'}</Badge>;
       default: return <Badge variant="secondary">N/A</Badge>;
     }
   };
@@ -151,7 +151,7 @@ export default function Run() {
     queryKey: ['execution', currentExecutionId],
     queryFn: () => currentExecutionId ? apiClient.executions.get(Number(currentExecutionId)) as Promise<Execution> : Promise.reject(new Error('No execution ID')),
     enabled: !!currentExecutionId,
-    refetchInterval: (query) => query.state.data?.status === 'running' ? 1000 : false,
+    refetchInterval: (query) => isExecutionActive(query.state.data?.status) ? 1000 : false,
     refetchIntervalInBackground: true,
     retry: 3,
   });
@@ -53,7 +53,7 @@ import { useChatDockStore, useExecutionControlStore } from '@/lib/store';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import type { Agent } from '@/types/agent';
 import type { Task } from '@/types/task';
-import type { Execution } from '@/types/execution';
+import { isExecutionActive, type Execution } from '@/types/execution';
 import {
   createGraphFromProject,
   applyAutoLayout,
@@ -1270,7 +1270,7 @@ function VisualEditorContent() {
 
           clearInterval(executionInterval);
 
-} else if (executionData.status === 'failed') {
+} else if (!isExecutionActive(executionData.status)) {
   if (lastExecutionStatusRef.current !== 'failed') {
     lastExecutionStatusRef.current = 'failed';
     const payload = executionData.output_payload as Record<string, unknown> | undefined;
@@ -1519,7 +1519,7 @@ const executionQuery = useQuery({
   enabled: !!currentExecution && !!currentExecution.id,
   refetchInterval: (data) => {
     // Poll more frequently when running, less when completed/error
-    if (data?.status === 'running') return 1000;
+    if (isExecutionActive(data?.status)) return 1000;
     if (data?.status === 'completed' || data?.status === 'error') return false;
     return 2000;
   },
@@ -1,5 +1,12 @@
 export type ExecutionStatus = 'created' | 'running' | 'completed' | 'error';
 
+// Statuses of an execution that has not finished yet: queued ('created') or running
+export const ACTIVE_EXECUTION_STATUSES: ExecutionStatus[] = ['created', 'running'];
+
+export function isExecutionActive(status?: string | null): boolean {
+  return ACTIVE_EXECUTION_STATUSES.includes(status as ExecutionStatus);
+}
+
 export interface Execution {
   id: string;
   project_id: string;
@@ -14,6 +21,8 @@ export interface Execution {
   created_at: string;
   updated_at: string;
   completed_at?: string;
+  queue_position?: number | null;
+  estimated_wait_s?: number | null;
 }
 
 export interface CreateExecutionRequest {
@@ -0,0 +1,30 @@
+import { apiClient } from '@/lib/api';
+import { isExecutionActive } from '@/types/execution';
+
+// Polls an execution until it leaves the queue and finishes (completed or error).
+// Executions that are already finished are returned as they are.
+export const pollExecutionCompletion = async (
+  execution: any,
+  maxAttempts = 30, // 30 attempts = 30 seconds max
+  intervalMs = 1000
+): Promise<any> => {
+  if (!isExecutionActive(execution?.status)) {
+    return execution;
+  }
+
+  let attempts = 0;
+  while (attempts < maxAttempts) {
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+    attempts++;
+    try {
+      const current = await apiClient.getExecution(execution.id);
+      if (!isExecutionActive(current.status)) {
+        return current;
+      }
+    } catch (error) {
+      console.error('Error polling execution:', error);
+    }
+  }
+
+  throw new Error('Execução não foi concluída no tempo esperado');
+};
@@ -1,43 +1,26 @@
 #!/usr/bin/env python3
 """
-Script para adicionar a coluna 'language' à tabela projects
+Script para adicionar a coluna 'language' à tabela projects.
+
+Mantido por compatibilidade: a alteração agora é a migração 1 de db/migrations.py
+(`python -m db.migrations`), que funciona em SQLite e PostgreSQL.
 """
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine, text
-from db.database import DATABASE_URL
+from db.database import Base, engine
+from db.migrations import run_migrations
 
 def add_language_column():
-    """Adiciona a coluna language à tabela projects"""
-    engine = create_engine(DATABASE_URL)
-
+    """Aplica as migrações pendentes, incluindo a coluna language"""
     try:
-        with engine.connect() as conn:
-            # Verifica se a coluna já existe (SQLite syntax)
-            result = conn.execute(text("""
-                PRAGMA table_info(projects)
-            """))
-
-            columns = result.fetchall()
-            column_names = [col[1] for col in columns]  # col[1] é o nome da coluna
-
-            if 'language' in column_names:
-                print("✅ Coluna 'language' já existe na tabela projects")
-                return
-
-            # Adiciona a coluna language
-            conn.execute(text("""
-                ALTER TABLE projects ADD COLUMN language VARCHAR(10) DEFAULT 'pt'
-            """))
-
-            conn.commit()
-            print("✅ Coluna 'language' adicionada com sucesso à tabela projects")
-
+        Base.metadata.create_all(bind=engine)
+        applied = run_migrations(engine)
+        print(f"✅ Migrações aplicadas: {applied}" if applied else "✅ Banco de dados já está atualizado")
     except Exception as e:
-        print(f"❌ Erro ao adicionar coluna language: {e}")
+        print(f"❌ Erro ao aplicar migrações: {e}")
         raise
 
 if __name__ == "__main__":
-    add_language_column()
\ No newline at end of file
+    add_language_column()
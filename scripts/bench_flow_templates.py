@@ -0,0 +1,82 @@
+"""Prompt-to-template matching time with a large template library.
+
+Loads the real templates from templates/flows plus ``--synthetic`` generated ones into a
+temporary directory, then times TemplateLibrary.match over a set of prompts.
+
+Usage:
+    python scripts/bench_flow_templates.py [--synthetic 500] [--rounds 2000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import yaml_io  # noqa: E402
+from src.flow_templates import FLOW_TEMPLATES_DIR, TemplateLibrary  # noqa: E402
+
+PROMPTS = [
+    "Analisar comentários de clientes e separar por sentimento positivo e negativo",
+    "Escrever um artigo de blog sobre inteligência artificial com SEO",
+    "Fazer uma pesquisa de mercado dos concorrentes e gerar relatório SWOT",
+    "Responder os chamados de suporte dos clientes por prioridade",
+    "Quero um fluxo que organize minha agenda da semana",
+]
+
+
+def synthetic_template(i: int, vocab: list) -> dict:
+    rng = random.Random(i)
+    return {
+        "type": f"synthetic_{i}",
+        "title": f"Template sintético {i}",
+        "match": {
+            "min_score": 3,
+            "groups": [
+                {"weight": 2, "required": True, "keywords": rng.sample(vocab, 6)},
+                {"weight": 1, "keywords": [w + "*" for w in rng.sample(vocab, 6)]},
+            ],
+        },
+        "agents": [{"name": f"Agente {i}", "role": "Executor", "goal": "Executar a tarefa"}],
+        "tasks": [{"agent_idx": 0, "description": "Executar", "expected_output": "Resultado"}],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    vocab = [f"termo{n:04d}" for n in range(3000)]
+    workdir = tempfile.mkdtemp(prefix="flow_templates_")
+    try:
+        for name in os.listdir(FLOW_TEMPLATES_DIR):
+            shutil.copy(os.path.join(FLOW_TEMPLATES_DIR, name), workdir)
+        for i in range(args.synthetic):
+            with open(os.path.join(workdir, f"synthetic_{i:04d}.yaml"), "w", encoding="utf-8") as f:
+                yaml_io.dump(synthetic_template(i, vocab), f)
+
+        library = TemplateLibrary(workdir)
+        start = time.perf_counter()
+        library.load()
+        load_ms = (time.perf_counter() - start) * 1000
+        print(f"templates={len(library.templates)} load={load_ms:.1f} ms")
+
+        for prompt in PROMPTS:
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                result = library.match(prompt)
+            per_call_us = (time.perf_counter() - start) / args.rounds * 1e6
+            label = result["detected_type"] if result else "-"
+            print(f"{per_call_us:8.1f} us  {label:<20} {prompt[:60]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
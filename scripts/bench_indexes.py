@@ -0,0 +1,110 @@
+"""Query plans and timings of the router hot paths before and after the index migrations.
+
+Usage:
+    python scripts/bench_indexes.py [--url sqlite:///./bench.db] [--projects 200] [--rows 50]
+
+By default a throwaway SQLite file is used. Pass a PostgreSQL URL to benchmark there
+(the tables are created in that database and dropped at the end).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+
+from db.database import Base  # noqa: E402
+from db import models  # noqa: E402
+from db.migrations import run_migrations, schema_migrations  # noqa: E402
+
+INDEXES = ["ix_agents_project_id", "ix_tasks_project_id", "ix_tasks_agent_id", "ix_executions_project_id_id"]
+
+QUERIES = {
+    "agents by project": "SELECT * FROM agents WHERE project_id = :pid",
+    "tasks by project": "SELECT * FROM tasks WHERE project_id = :pid",
+    "tasks by agent": "SELECT count(*) FROM tasks WHERE agent_id = :aid",
+    "executions by project": "SELECT * FROM executions WHERE project_id = :pid ORDER BY id DESC LIMIT 50",
+    "executions count": "SELECT count(*) FROM executions WHERE project_id = :pid",
+}
+
+
+def seed(engine, projects: int, rows: int):
+    with engine.begin() as conn:
+        conn.execute(insert(models.Project), [{"name": f"p{i}", "language": "pt"} for i in range(projects)])
+        conn.execute(insert(models.Agent), [
+            {"project_id": p + 1, "name": f"a{j}", "role": "r", "goal": "g", "tools": []}
+            for p in range(projects) for j in range(rows)
+        ])
+        conn.execute(insert(models.Task), [
+            {"project_id": p + 1, "agent_id": p * rows + j + 1, "description": "d", "tools": []}
+            for p in range(projects) for j in range(rows)
+        ])
+        conn.execute(insert(models.Execution), [
+            {"project_id": p + 1, "status": "completed", "input_payload": {}, "output_payload": {}, "logs": ""}
+            for p in range(projects) for _ in range(rows * 4)
+        ])
+
+
+def explain(conn, sql: str, params: dict) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        return " | ".join(r[-1] for r in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}"), params).fetchall()
+    return " | ".join(r[0].strip() for r in rows)
+
+
+def measure(engine, label: str, projects: int, rounds: int = 200):
+    print(f"\n== {label} ==")
+    params = {"pid": projects // 2, "aid": 7}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = explain(conn, sql, params)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                conn.execute(text(sql), params).fetchall()
+            per_query = (time.perf_counter() - start) / rounds * 1e6
+            print(f"{name:<24} {per_query:9.1f} us  {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=50)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if not url:
+        tmpdir = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    engine = create_engine(url)
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        # Simulate a database created before the indexes were declared
+        with engine.begin() as conn:
+            for name in INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        seed(engine, args.projects, args.rows)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        measure(engine, "before migrations", args.projects)
+
+        print(f"\napplied migrations: {run_migrations(engine)}")
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        measure(engine, "after migrations", args.projects)
+    finally:
+        if args.url:
+            Base.metadata.drop_all(bind=engine)
+            schema_migrations.drop(bind=engine, checkfirst=True)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Serialization time and wire size of a 10k-row execution list.
+
+Compares FastAPI's default path (validate into ExecutionRead, jsonable_encoder, json.dumps)
+with the direct rows -> orjson path used by the list endpoints, then reports gzip/brotli sizes.
+
+Usage:
+    python scripts/bench_serialization.py [--rows 10000] [--log-bytes 2000]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from api.schemas import ExecutionRead  # noqa: E402
+from db import models  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_rows(n: int, log_bytes: int):
+    line = "[agent] Thinking about the next step of the task...\n"
+    logs = (line * (log_bytes // len(line) + 1))[:log_bytes]
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": i,
+            "project_id": i % 50 + 1,
+            "status": "completed" if i % 7 else "error",
+            "input_payload": {"produto": "Widget", "periodo": 4},
+            "output_payload": {"result": f"Resultado da execução {i}"},
+            "logs": logs,
+            "created_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, rounds: int = 3):
+    best = float("inf")
+    out = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--log-bytes", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.log_bytes)
+    orm_objects = [models.Execution(**r) for r in rows]
+    adapter = TypeAdapter(List[ExecutionRead])
+
+    def default_path():
+        validated = adapter.validate_python(orm_objects, from_attributes=True)
+        return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json"))).encode()
+
+    def direct_path():
+        return orjson.dumps([dict(r) for r in rows])
+
+    t_default, body_default = timed(default_path)
+    t_direct, body_direct = timed(direct_path)
+    print(f"rows={args.rows} log_bytes={args.log_bytes}")
+    print(f"default (validate + jsonable_encoder + json): {t_default * 1000:8.1f} ms  {len(body_default):>10} bytes")
+    print(f"direct rows + orjson:                         {t_direct * 1000:8.1f} ms  {len(body_direct):>10} bytes")
+    print(f"speedup: {t_default / t_direct:.1f}x")
+
+    t_gzip, gz = timed(lambda: gzip.compress(body_direct, compresslevel=9))
+    print(f"\ngzip:   {len(gz):>10} bytes ({len(gz) / len(body_direct):.1%})  {t_gzip * 1000:.1f} ms")
+    if brotli is not None:
+        t_br, br = timed(lambda: brotli.compress(body_direct, quality=4))
+        print(f"brotli: {len(br):>10} bytes ({len(br) / len(body_direct):.1%})  {t_br * 1000:.1f} ms")
+    else:
+        print("brotli: not installed")
+
+
+if __name__ == "__main__":
+    main()
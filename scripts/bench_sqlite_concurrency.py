@@ -0,0 +1,101 @@
+"""Concurrent write/read benchmark: default SQLite engine vs the tuned engine from db.database.
+
+One writer thread mimics the executor's on_log callback (append to executions.logs and commit
+per chunk) while reader threads poll GET /executions-style queries.
+
+Usage:
+    python scripts/bench_sqlite_concurrency.py [--seconds 5] [--readers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from db.database import Base, build_engine  # noqa: E402
+from db import models  # noqa: E402
+
+
+def run(engine, seconds: float, readers: int) -> dict:
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(models.Project(id=1, name="bench"))
+        db.add_all([models.Execution(project_id=1, status="running", logs="") for _ in range(50)])
+        db.commit()
+
+    stop = time.monotonic() + seconds
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        with Session() as db:
+            while time.monotonic() < stop:
+                try:
+                    db.execute(
+                        update(models.Execution)
+                        .where(models.Execution.id == 1)
+                        .values(logs=models.Execution.logs + "chunk of executor output\n")
+                    )
+                    db.commit()
+                    bump("writes")
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+
+    def reader():
+        with Session() as db:
+            while time.monotonic() < stop:
+                try:
+                    db.execute(
+                        select(models.Execution).where(models.Execution.project_id == 1)
+                        .order_by(models.Execution.id.desc()).limit(50)
+                    ).all()
+                    db.rollback()
+                    bump("reads")
+                except OperationalError:
+                    db.rollback()
+                    bump("locked")
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    profiles = {
+        "default (rollback journal)": create_engine(f"sqlite:///{tmpdir}/default.db", pool_pre_ping=True),
+        "tuned (WAL + busy_timeout)": build_engine(f"sqlite:///{tmpdir}/tuned.db"),
+    }
+    for label, engine in profiles.items():
+        c = run(engine, args.seconds, args.readers)
+        print(
+            f"{label:<28} writes/s={c['writes'] / args.seconds:8.0f}  "
+            f"reads/s={c['reads'] / args.seconds:8.0f}  locked errors={c['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""YAML load/dump time of large agents.yaml/tasks.yaml files: pure Python vs libyaml.
+
+Writes ``--agents`` agents and ``--tasks`` tasks (in the exporter's format) to a temporary
+directory, then times parsing and emitting them with PyYAML's SafeLoader/SafeDumper and
+with src.yaml_io, which uses CSafeLoader/CSafeDumper when available.
+
+Usage:
+    python scripts/bench_yaml.py [--agents 2000] [--tasks 10000] [--rounds 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yaml  # noqa: E402
+
+from src import yaml_io  # noqa: E402
+
+WORDS = "análise relatório cliente mercado conteúdo pesquisa dados tendência revisão estratégia".split()
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def fixtures(n_agents: int, n_tasks: int):
+    rng = random.Random(42)
+    agents = [
+        {
+            "name": f"Agente {i}",
+            "role": sentence(rng, 3),
+            "goal": sentence(rng, 20),
+            "backstory": "\n".join(sentence(rng, 15) for _ in range(3)),
+            "tools": rng.sample(["web_search", "file_read", "scrape", "csv"], 2),
+            "verbose": True,
+            "memory": False,
+            "allow_delegation": bool(i % 2),
+        }
+        for i in range(n_agents)
+    ]
+    tasks = [
+        {
+            "agent": f"Agente {rng.randrange(n_agents)}",
+            "description": "\n".join(sentence(rng, 25) for _ in range(2)),
+            "expected_output": sentence(rng, 12),
+            "tools": [],
+            "async_execution": False,
+            "output_file": f"out/task_{i}.md",
+        }
+        for i in range(n_tasks)
+    ]
+    return agents, tasks
+
+
+def timed(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"libyaml available: {yaml_io.LIBYAML}")
+    agents, tasks = fixtures(args.agents, args.tasks)
+    workdir = tempfile.mkdtemp(prefix="bench_yaml_")
+    try:
+        for name, data in (("agents.yaml", agents), ("tasks.yaml", tasks)):
+            path = os.path.join(workdir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                yaml_io.dump(data, f)
+            with open(path, "rb") as f:
+                raw = f.read()
+            assert yaml_io.load(raw) == yaml.load(raw, Loader=yaml.SafeLoader) == data
+
+            pure_load = timed(lambda: yaml.load(raw, Loader=yaml.SafeLoader), args.rounds)
+            fast_load = timed(lambda: yaml_io.load(raw), args.rounds)
+            pure_dump = timed(
+                lambda: yaml.dump(data, Dumper=yaml.SafeDumper, allow_unicode=True, sort_keys=False), args.rounds
+            )
+            fast_dump = timed(lambda: yaml_io.dump(data), args.rounds)
+            print(f"{name} ({len(data)} items, {len(raw) / 1e6:.1f} MB)")
+            print(f"  load  pure {pure_load * 1000:8.0f} ms   yaml_io {fast_load * 1000:8.0f} ms   x{pure_load / fast_load:.1f}")
+            print(f"  dump  pure {pure_dump * 1000:8.0f} ms   yaml_io {fast_dump * 1000:8.0f} ms   x{pure_dump / fast_dump:.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Convert n8n workflows and check the result is a valid, parallel-preserving crew.
+
+For every workflow (default: samples/n8n_*.json) this checks that each enabled step node
+becomes exactly one task, that every upstream step appears in the task's context and
+only earlier tasks do, that no n8n edge is duplicated, and that async flags follow the
+rules CrewAI validates for sequential crews. Then it prints how many tasks may run in
+parallel and the conversion time.
+
+Usage:
+    python scripts/check_n8n_conversion.py [workflow.json ...] [--rounds 20]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api.utils_n8n import back_edges, build_n8n_graph, convert_n8n_to_crewai, _is_trigger  # noqa: E402
+
+
+def check(workflow: dict) -> dict:
+    project = convert_n8n_to_crewai(workflow)
+    tasks = project["tasks"]
+    nodes, succ, pred = build_n8n_graph(workflow)
+    loops = back_edges(succ, pred)
+    steps = {n["name"] for n in nodes if not n.get("disabled") and not _is_trigger(n.get("type", ""))}
+
+    names = [t["agent"] for t in tasks]
+    assert len(names) == len(set(names)), "a node became more than one task"
+    assert set(names) == steps, f"steps without task: {sorted(steps - set(names))[:5]}"
+    assert {a["name"] for a in project["agents"]} == steps
+
+    position = {name: i for i, name in enumerate(names)}
+    index = {n["name"]: i for i, n in enumerate(nodes)}
+    for i, task in enumerate(tasks):
+        context = task["context"]
+        assert len(context) == len(set(context)), f"duplicated context in {task['agent']}"
+        assert all(j < i for j in context), f"{task['agent']} depends on a later task"
+        node = index[task["agent"]]
+        expected = {position[nodes[p]["name"]] for p in pred[node] if (p, node) not in loops and nodes[p]["name"] in position}
+        assert set(context) == expected, f"{task['agent']}: context {context} != upstream {sorted(expected)}"
+        if task["async_execution"]:
+            # CrewAI: an async task cannot use the output of the async tasks running next to it
+            j = i - 1
+            while j >= 0 and tasks[j]["async_execution"]:
+                assert j not in context, f"{task['agent']} waits on a concurrent async task"
+                j -= 1
+    assert not (len(tasks) >= 2 and tasks[-1]["async_execution"] and tasks[-2]["async_execution"])
+
+    edges = sum(len(s) for s in succ)
+    raw = sum(len(c) for out in workflow.get("connections", {}).values() for b in out.get("main") or [] for c in [b or []])
+    groups, width = 0, 0
+    for task in tasks:
+        width = width + 1 if task["async_execution"] else 0
+        groups += 1 if width == 1 else 0
+    return {
+        "nodes": len(workflow.get("nodes") or []),
+        "tasks": len(tasks),
+        "edges": f"{raw}->{edges}",
+        "loops": len(loops),
+        "async": sum(t["async_execution"] for t in tasks),
+        "parallel_groups": groups,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, "samples", "n8n_*.json")))
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            workflow = json.load(f)
+        stats = check(workflow)
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            convert_n8n_to_crewai(workflow)
+        ms = (time.perf_counter() - start) / args.rounds * 1000
+        summary = " ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"OK {os.path.basename(path)}: {summary} convert={ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
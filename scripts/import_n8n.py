@@ -0,0 +1,115 @@
+"""Import many n8n workflow exports at once, converting them in parallel.
+
+Accepts directories (every ``*.json`` below them), single workflow files and ZIP archives
+(the same layout ``POST /import/bulk`` takes). Files are converted in a process pool, one
+chunk of files per task, then imported with the bulk importer: deduplicated by content
+hash, one transaction per ``IMPORT_BULK_BATCH_SIZE`` projects. Prints one line per workflow
+with its status and the integrations detected in it.
+
+Usage:
+    python scripts/import_n8n.py exports/ more.zip flow.json [--workers 8] [--dry-run] [--report report.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api.utils_import import bulk_chunks, list_bulk_members, parse_bulk_document, read_bulk_members  # noqa: E402
+
+
+def convert_files(paths: List[str]) -> List[Dict[str, Any]]:
+    items = []
+    for path in paths:
+        item: Dict[str, Any] = {"filename": path, "content_hash": None}
+        try:
+            with open(path, "rb") as f:
+                parse_bulk_document(item, f.read())
+        except Exception as e:
+            item["error"] = str(e) or type(e).__name__
+        items.append(item)
+    return items
+
+
+def convert_members(archive: str, names: List[str]) -> List[Dict[str, Any]]:
+    items = read_bulk_members(archive, names)
+    for item in items:
+        item["filename"] = f"{os.path.basename(archive)}/{item['filename']}"
+    return items
+
+
+def collect(inputs: List[str]):
+    """Split inputs into loose files and ZIP archives."""
+    files, archives = [], []
+    for path in inputs:
+        if os.path.isdir(path):
+            for base, _, names in os.walk(path):
+                files.extend(os.path.join(base, n) for n in sorted(names) if n.lower().endswith(".json"))
+        elif path.lower().endswith(".zip"):
+            archives.append(path)
+        else:
+            files.append(path)
+    return files, archives
+
+
+def convert(inputs: List[str], workers: int) -> List[Dict[str, Any]]:
+    files, archives = collect(inputs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(convert_files, chunk) for chunk in bulk_chunks(files, workers)]
+        for archive in archives:
+            names = list_bulk_members(archive)
+            jobs.extend(pool.submit(convert_members, archive, chunk) for chunk in bulk_chunks(names, workers))
+        return [item for job in jobs for item in job.result()]
+
+
+def store(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from db.database import SessionLocal
+    from db.seed import init_db
+    from src.project_import import ImportDefaults, import_projects
+
+    init_db()
+    with SessionLocal() as db:
+        return import_projects(db, items, ImportDefaults.from_settings(db))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="directories, .json workflows or .zip archives")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dry-run", action="store_true", help="convert and report without importing")
+    parser.add_argument("--report", help="write the per-workflow report to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    items = convert(args.inputs, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Converted {len(items)} files in {elapsed:.2f} s with {args.workers} workers")
+    if args.dry_run:
+        for item in items:
+            item["status"] = "error" if item.get("error") else "converted"
+            item["name"] = (item.get("project") or {}).get("name")
+    else:
+        items = store(items)
+
+    report = []
+    for item in items:
+        integrations = item.get("integrations") or []
+        detail = item.get("error") or f"{item.get('name')} [{', '.join(integrations) or '-'}]"
+        print(f"{item['status']:9} {item['filename']}: {detail}")
+        report.append({k: v for k, v in item.items() if k != "project"})
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    print(" ".join(f"{status}={n}" for status, n in sorted(counts.items())))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
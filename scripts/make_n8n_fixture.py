@@ -0,0 +1,118 @@
+"""Generate samples/n8n_large_workflow.json, a production-sized n8n workflow.
+
+The workflow mirrors a lead-processing automation: webhook and schedule triggers fan out
+into one pipeline per region, each with parallel enrichment calls, IF nodes whose true and
+false outputs both reach the same Merge, a SplitInBatches loop, an AI agent with a
+language-model sub-node, sticky notes and a disabled node. Output is deterministic.
+
+Usage:
+    python scripts/make_n8n_fixture.py [--regions 12] [--out samples/n8n_large_workflow.json]
+"""
+import argparse
+import json
+import os
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENRICHERS = [
+    ("Clearbit", "https://person.clearbit.com/v2/combined/find"),
+    ("Hunter", "https://api.hunter.io/v2/email-verifier"),
+    ("GitHub", "https://api.github.com/users/{{$json.login}}"),
+    ("Company DB", "https://internal.example.com/companies"),
+]
+
+
+class Builder:
+    def __init__(self):
+        self.nodes = []
+        self.connections = {}
+
+    def node(self, name, node_type, parameters=None, **extra):
+        node_id = str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+        x, y = 250 * (len(self.nodes) % 12), 200 * (len(self.nodes) // 12)
+        self.nodes.append({
+            "id": node_id, "name": name, "type": node_type, "typeVersion": 1,
+            "position": [x, y], "parameters": parameters or {}, **extra,
+        })
+        return name
+
+    def link(self, source, target, output=0, kind="main"):
+        outputs = self.connections.setdefault(source, {}).setdefault(kind, [])
+        while len(outputs) <= output:
+            outputs.append([])
+        outputs[output].append({"node": target, "type": kind, "index": 0})
+
+
+def region(b: Builder, name: str, entry: str, summary: str) -> None:
+    split = b.node(f"{name} Split Leads", "n8n-nodes-base.splitInBatches", {"batchSize": 50})
+    b.link(entry, split)
+    normalize = b.node(f"{name} Normalize", "n8n-nodes-base.set", {"values": {"string": [{"name": "region", "value": name}]}})
+    b.link(split, normalize)
+
+    merge = b.node(f"{name} Merge Enrichment", "n8n-nodes-base.merge", {"mode": "combine"})
+    for label, url in ENRICHERS:
+        call = b.node(f"{name} {label}", "n8n-nodes-base.httpRequest", {"method": "GET", "url": url})
+        b.link(normalize, call)
+        b.link(call, merge)
+    # The same enrichment wired twice, as happens after copy/paste on the canvas
+    b.link(normalize, f"{name} {ENRICHERS[0][0]}")
+
+    check = b.node(f"{name} Is Qualified", "n8n-nodes-base.if", {"conditions": {"number": [{"value1": "={{$json.score}}", "value2": 60}]}})
+    b.link(merge, check)
+    score = b.node(f"{name} Score Lead", "n8n-nodes-base.function", {"functionCode": "return items;"})
+    # Both IF outputs reach the same node: one deduplicated edge
+    b.link(check, score, output=0)
+    b.link(check, score, output=1)
+
+    agent = b.node(f"{name} Write Outreach", "@n8n/n8n-nodes-langchain.agent", {"text": "={{$json.summary}}"})
+    model = b.node(f"{name} OpenAI Model", "@n8n/n8n-nodes-langchain.lmChatOpenAi", {"model": "gpt-4o-mini"})
+    b.link(model, agent, kind="ai_languageModel")
+    b.link(score, agent)
+
+    crm = b.node(f"{name} Update CRM", "n8n-nodes-base.hubspot", {"resource": "contact"})
+    slack = b.node(f"{name} Notify Slack", "n8n-nodes-base.slack", {"channel": f"#leads-{name.lower()}"})
+    legacy = b.node(f"{name} Legacy Export", "n8n-nodes-base.ftp", {}, disabled=True)
+    b.link(agent, crm)
+    b.link(agent, slack)
+    b.link(agent, legacy)
+    b.link(legacy, summary)
+    b.link(crm, summary)
+    b.link(slack, summary)
+    # Loop back for the next batch of leads
+    b.link(crm, split)
+    b.node(f"{name} Note", "n8n-nodes-base.stickyNote", {"content": f"Pipeline da região {name}"})
+
+
+def build(regions: int) -> dict:
+    b = Builder()
+    webhook = b.node("Lead Webhook", "n8n-nodes-base.webhook", {"path": "leads", "httpMethod": "POST"})
+    schedule = b.node("Nightly Import", "n8n-nodes-base.scheduleTrigger", {"rule": {"interval": [{"field": "days"}]}})
+    fetch = b.node("Fetch Pending Leads", "n8n-nodes-base.postgres", {"operation": "executeQuery", "query": "SELECT 1"})
+    b.link(schedule, fetch)
+    route = b.node("Route By Region", "n8n-nodes-base.switch", {"rules": {"values": []}})
+    b.link(webhook, route)
+    b.link(fetch, route)
+    summary = b.node("Daily Summary", "n8n-nodes-base.merge", {"mode": "append"})
+    for i in range(regions):
+        name = f"R{i + 1:02d}"
+        entry = b.node(f"{name} Entry", "n8n-nodes-base.noOp")
+        b.link(route, entry, output=i)
+        region(b, name, entry, summary)
+    report = b.node("Send Report", "n8n-nodes-base.emailSend", {"toEmail": "sales@example.com"})
+    b.link(summary, report)
+    return {"name": "Lead Processing (large)", "nodes": b.nodes, "connections": b.connections, "active": False, "settings": {}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=12)
+    parser.add_argument("--out", default=os.path.join(ROOT, "samples", "n8n_large_workflow.json"))
+    args = parser.parse_args()
+    workflow = build(args.regions)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(workflow, f, ensure_ascii=False, indent=1)
+    print(f"OK -> {args.out} ({len(workflow['nodes'])} nodes)")
+
+
+if __name__ == "__main__":
+    main()
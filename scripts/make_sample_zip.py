@@ -1,9 +1,13 @@
 import io
 import os
+import sys
 import zipfile
 
-ROOT = os.path.dirname(os.path.dirname(__file__))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SAMPLES = os.path.join(ROOT, 'samples')
+sys.path.insert(0, ROOT)
+
+from src import yaml_io  # noqa: E402
 
 
 def main():
@@ -19,15 +23,13 @@ def main():
         "language": "pt",
     }
 
-    import yaml  # type: ignore
-
     with open(agents_path, 'r', encoding='utf-8') as fa:
         agents_content = fa.read()
     with open(tasks_path, 'r', encoding='utf-8') as ft:
         tasks_content = ft.read()
 
     with zipfile.ZipFile(out_zip, 'w', zipfile.ZIP_DEFLATED) as z:
-        z.writestr('project.json', yaml.safe_dump(project_json, allow_unicode=True, sort_keys=False))
+        z.writestr('project.json', yaml_io.dump(project_json))
         z.writestr('agents.yaml', agents_content)
         z.writestr('tasks.yaml', tasks_content)
 
@@ -0,0 +1,140 @@
+"""Execution analytics served from incremental rollups.
+
+Every finished execution increments an hourly and a daily ``execution_rollups`` row
+keyed by (project, period, duration bucket). Buckets are log-scale, so percentiles are
+computed from a few thousand pre-aggregated rows instead of every execution: windows
+of up to a day read the hourly rows, longer windows the daily ones.
+"""
+import math
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from db import models
+
+BUCKET_BASE_MS = 100.0
+BUCKET_RATIO = 1.25
+HOURLY, DAILY = 1, 24
+_EPOCH = date(1970, 1, 1)
+
+
+def duration_bucket(duration_ms: float) -> int:
+    if duration_ms <= BUCKET_BASE_MS:
+        return 0
+    return int(math.log(duration_ms / BUCKET_BASE_MS, BUCKET_RATIO)) + 1
+
+
+def bucket_value_ms(bucket: int) -> float:
+    """Representative duration of a bucket (geometric middle of its bounds)."""
+    if bucket <= 0:
+        return BUCKET_BASE_MS / 2
+    return BUCKET_BASE_MS * BUCKET_RATIO ** (bucket - 0.5)
+
+
+def current_hour() -> int:
+    return int(time.time() // 3600)
+
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def record_execution(db: Session, project_id: int, status: str, duration_ms: float, hour: Optional[int] = None) -> None:
+    """Add one finished execution to its hourly and daily rollups (atomic upserts; caller commits)."""
+    hour = current_hour() if hour is None else hour
+    ok = 1 if status == "completed" else 0
+    insert = _dialect_insert(db)
+    t = models.ExecutionRollup
+    stmt = insert(t)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.project_id, t.resolution, t.period, t.bucket],
+        set_={
+            "runs": t.runs + stmt.excluded.runs,
+            "successes": t.successes + stmt.excluded.successes,
+            "errors": t.errors + stmt.excluded.errors,
+            "duration_ms_sum": t.duration_ms_sum + stmt.excluded.duration_ms_sum,
+        },
+    )
+    row = {
+        "project_id": project_id,
+        "bucket": duration_bucket(duration_ms),
+        "runs": 1,
+        "successes": ok,
+        "errors": 1 - ok,
+        "duration_ms_sum": int(duration_ms),
+    }
+    for resolution in (HOURLY, DAILY):
+        db.execute(stmt.values(resolution=resolution, period=hour // resolution, **row))
+
+
+def stats_statements(project_id: Optional[int], days: int, now_hour: Optional[int] = None):
+    """(per-bucket, per-day) aggregate queries for the last ``days`` days."""
+    now_hour = current_hour() if now_hour is None else now_hour
+    t = models.ExecutionRollup
+    if days <= 1:
+        resolution, since = HOURLY, now_hour - 23
+    else:
+        resolution, since = DAILY, now_hour // 24 - days + 1
+    where = [t.resolution == resolution, t.period >= since]
+    if project_id is not None:
+        where.append(t.project_id == project_id)
+    by_bucket = (
+        select(t.bucket, func.sum(t.runs), func.sum(t.successes), func.sum(t.errors), func.sum(t.duration_ms_sum))
+        .where(*where).group_by(t.bucket).order_by(t.bucket)
+    )
+    day = t.period * resolution // 24
+    by_day = (
+        select(day, func.sum(t.runs), func.sum(t.successes), func.sum(t.errors))
+        .where(*where).group_by(day).order_by(day)
+    )
+    return by_bucket, by_day
+
+
+def _percentile(buckets: list, total: int, q: float) -> Optional[float]:
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for bucket, runs in buckets:
+        seen += runs
+        if seen >= rank:
+            return round(bucket_value_ms(bucket), 1)
+    return round(bucket_value_ms(buckets[-1][0]), 1)
+
+
+def summarize(bucket_rows: Iterable, day_rows: Iterable, project_id: Optional[int], days: int) -> Dict[str, Any]:
+    buckets = []
+    runs = successes = errors = duration_sum = 0
+    for bucket, b_runs, b_ok, b_err, b_sum in bucket_rows:
+        buckets.append((bucket, int(b_runs or 0)))
+        runs += int(b_runs or 0)
+        successes += int(b_ok or 0)
+        errors += int(b_err or 0)
+        duration_sum += int(b_sum or 0)
+    return {
+        "project_id": project_id,
+        "days": days,
+        "runs": runs,
+        "successes": successes,
+        "errors": errors,
+        "success_rate": round(successes / runs, 4) if runs else None,
+        "avg_duration_ms": round(duration_sum / runs, 1) if runs else None,
+        "p50_duration_ms": _percentile(buckets, runs, 0.50),
+        "p95_duration_ms": _percentile(buckets, runs, 0.95),
+        "per_day": [
+            {
+                "day": (_EPOCH + timedelta(days=int(d))).isoformat(),
+                "runs": int(d_runs or 0),
+                "successes": int(d_ok or 0),
+                "errors": int(d_err or 0),
+            }
+            for d, d_runs, d_ok, d_err in day_rows
+        ],
+    }
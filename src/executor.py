@@ -1,26 +1,64 @@
 import os
 import contextlib
+import hashlib
 import io
-from typing import Dict, Any, List, Callable, Optional
+import json
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Callable, NamedTuple, Optional, Tuple
 from crewai import Agent, Task, Crew, Process, LLM
+from crewai.agents.cache import CacheHandler
 from .tools_config import available_tools
+from .task_graph import task_links
+from sqlalchemy import and_, func, or_, update
 from db.database import SessionLocal
 from db import models
+from .analytics import record_execution
+from src.settings import get_setting
+
+# Projects whose compiled crews are kept in this worker; unchanged projects skip rebuilding
+# the CrewAI agents, tasks, tools and LLM on the next run
+CREW_CACHE_MAX = int(os.getenv("CREW_CACHE_MAX", "64"))
+# Compiled crews kept per project, for runs of the same project that overlap
+CREW_CACHE_IDLE = 2
+# Settings read while building the LLM and the tools; a change rebuilds the crew
+CREW_SETTINGS = ("GEMINI_API_KEY", "OPENROUTER_API_KEY", "OPENROUTER_BASE_URL", "MAX_TOKENS", "SERPER_API_KEY", "LLM_STREAM")
+# Live logs are appended to the execution row in batches: after this many seconds or characters
+EXECUTION_LOG_FLUSH_INTERVAL = float(os.getenv("EXECUTION_LOG_FLUSH_INTERVAL", "0.5"))
+EXECUTION_LOG_FLUSH_CHARS = int(os.getenv("EXECUTION_LOG_FLUSH_CHARS", "4096"))
+# Every process renews the lease of its queued and running executions this often (s); an
+# execution whose lease is older than EXECUTION_LEASE_TTL lost its process and is failed
+EXECUTION_HEARTBEAT_INTERVAL = float(os.getenv("EXECUTION_HEARTBEAT_INTERVAL", "30"))
+EXECUTION_LEASE_TTL = float(os.getenv("EXECUTION_LEASE_TTL", "120"))
+
+# Owner id written to the executions this process accepts (executions.runner)
+RUNNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+
+
+def llm_streaming() -> bool:
+    """Opt-in LLM_STREAM setting: completion tokens show up in the execution logs as they arrive."""
+    return get_setting(None, "LLM_STREAM", "false").lower() in ("1", "true", "yes", "on")
+
 
 # Helper to pick the LLM provider for CrewAI
 def build_llm(model_provider: str, model_name: str) -> LLM:
     provider = (model_provider or "openrouter").lower()
     if provider == "gemini":
         # CrewAI LLM generic wrapper; we set provider 'google' and model name (e.g., 'gemini-1.5-flash-002')
-        return LLM(model=model_name, provider="google", api_key=os.getenv("GEMINI_API_KEY"))
+        return LLM(model=model_name, provider="google", api_key=get_setting(None, "GEMINI_API_KEY"), stream=llm_streaming())
     else:
         # OpenRouter via OpenAI-compatible base URL
-        os.environ["OPENAI_API_KEY"] = os.getenv("OPENROUTER_API_KEY", "")
-        os.environ["OPENAI_API_BASE"] = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
-        # Limit max_tokens to avoid credit issues - configurable via env var
-        max_tokens_env = os.getenv("MAX_TOKENS")
+        os.environ["OPENAI_API_KEY"] = get_setting(None, "OPENROUTER_API_KEY", "")
+        os.environ["OPENAI_API_BASE"] = get_setting(None, "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+        # Limit max_tokens to avoid credit issues - configurable via settings or env var
+        max_tokens_env = get_setting(None, "MAX_TOKENS")
         max_tokens = int(max_tokens_env) if max_tokens_env else 1000
-        return LLM(model=model_name, max_tokens=max_tokens)  # CrewAI uses OpenAI-compatible client underneath
+        # CrewAI uses OpenAI-compatible client underneath; streamed chunks are printed by its event listener
+        return LLM(model=model_name, max_tokens=max_tokens, stream=llm_streaming())
 
 def get_language_instruction(language: str) -> str:
     """Retorna instruções específicas para o idioma"""
@@ -50,12 +88,148 @@ class _CallbackIO(io.StringIO):
         return n
 
 
-def execute(project, agents, tasks, inputs: Dict[str, Any], execution_language: str = None, on_log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+# Thread running each execution -> its log buffer
+_log_sinks: Dict[int, _CallbackIO] = {}
+_log_sinks_lock = threading.Lock()
+
+
+class _RoutedStdout:
+    """sys.stdout replacement sending each execution thread's output to that execution's logs.
+
+    Threads CrewAI starts for async tasks have no buffer of their own; their output goes to
+    the running execution when there is only one. Everything else reaches the real stdout.
+    """
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    def _target(self):
+        sink = _log_sinks.get(threading.get_ident())
+        if sink is None:
+            sinks = list(_log_sinks.values())
+            sink = sinks[0] if len(sinks) == 1 else None
+        return sink or self._fallback
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+@contextlib.contextmanager
+def _capture_stdout(buf: _CallbackIO):
+    """Like contextlib.redirect_stdout, but only for this thread, so concurrent runs keep their logs apart."""
+    ident = threading.get_ident()
+    with _log_sinks_lock:
+        if not isinstance(sys.stdout, _RoutedStdout):
+            sys.stdout = _RoutedStdout(sys.stdout)
+        _log_sinks[ident] = buf
+    try:
+        yield buf
+    finally:
+        with _log_sinks_lock:
+            _log_sinks.pop(ident, None)
+
+
+class _LogWriter:
+    """Appends log chunks to an execution row in batches instead of one commit per write.
+
+    A batch is written once it reaches EXECUTION_LOG_FLUSH_CHARS, or EXECUTION_LOG_FLUSH_INTERVAL
+    seconds after its first chunk, so streamed tokens show up quickly without a write per token.
+    """
+
+    def __init__(self, execution_id: int):
+        self.execution_id = execution_id
+        self._parts: List[str] = []
+        self._size = 0
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def write(self, chunk: str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._parts.append(chunk)
+            self._size += len(chunk)
+            if self._size >= EXECUTION_LOG_FLUSH_CHARS:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(EXECUTION_LOG_FLUSH_INTERVAL, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self._flush()
+
+    def close(self) -> None:
+        """Stop writing; the caller stores the complete logs itself."""
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._parts.clear()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._parts:
+            return
+        chunk = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        db = SessionLocal()
+        try:
+            # Appended in SQL so the growing log is never read back
+            db.execute(
+                update(models.Execution)
+                .where(models.Execution.id == self.execution_id)
+                .values(logs=func.coalesce(models.Execution.logs, "") + chunk)
+            )
+            db.commit()
+        except Exception:
+            # Ignore logging errors to prevent execution failure
+            db.rollback()
+        finally:
+            db.close()
+
+
+class _CompiledCrew(NamedTuple):
+    crew: Crew
+    agent_texts: List[Tuple[str, str, str]]  # role, goal, backstory as built
+    task_texts: List[Tuple[str, str]]  # description template, expected output as built
+
+
+class _CachedCrews(NamedTuple):
+    key: str
+    idle: List[_CompiledCrew]
+
+
+_crew_cache: Dict[int, _CachedCrews] = {}
+_crew_lock = threading.Lock()
+
+
+def crew_key(project, agents, tasks, language: str) -> str:
+    """Hash of everything a compiled crew is built from: project model, language, agents, tasks and settings."""
+    definition = [
+        project.model_provider, project.model_name, language,
+        [[a.id, a.role, a.goal, a.backstory, a.tools, a.verbose, a.memory, a.allow_delegation] for a in agents],
+        [[t.id, t.agent_id, t.description, t.expected_output, t.async_execution, t.context] for t in tasks],
+        [get_setting(None, name) for name in CREW_SETTINGS],
+    ]
+    return hashlib.sha256(json.dumps(definition, default=str).encode()).hexdigest()
+
+
+def compile_crew(project, agents, tasks, language: str) -> _CompiledCrew:
     # Single shared LLM for all agents in this project
     llm = build_llm(project.model_provider, project.model_name)
-
-    # Get language instruction - use execution language if provided, otherwise use project language
-    language = execution_language or getattr(project, 'language', 'pt-br')
     language_instruction = get_language_instruction(language)
 
     crew_agents: List[Agent] = []
@@ -76,64 +250,221 @@ def execute(project, agents, tasks, inputs: Dict[str, Any], execution_language:
 
     crew_tasks: List[Task] = []
     id_to_index = {a.id: i for i, a in enumerate(agents)}
-    for t in tasks:
+    for t, (async_execution, context) in zip(tasks, task_links(tasks)):
         idx = id_to_index.get(t.agent_id, 0)
-        # Simple template formatting with inputs
-        desc = t.description
-        try:
-            if inputs:
-                desc = desc.format(**inputs)
-        except Exception:
-            pass
-
         # Add language instruction to expected output
         enhanced_expected_output = f"{t.expected_output or ''}\n\n{language_instruction}"
 
+        # Without an explicit context CrewAI passes along the previous outputs
+        links = {"context": [crew_tasks[j] for j in context]} if context else {}
         crew_tasks.append(Task(
-            description=desc,
+            description=t.description,
             expected_output=enhanced_expected_output,
             agent=crew_agents[idx],
+            async_execution=async_execution,
+            **links,
         ))
 
-    crew = Crew(agents=crew_agents, tasks=crew_tasks, process=Process.sequential)
+    return _CompiledCrew(
+        crew=Crew(agents=crew_agents, tasks=crew_tasks, process=Process.sequential),
+        agent_texts=[(a.role, a.goal, a.backstory) for a in crew_agents],
+        task_texts=[(t.description, t.expected_output) for t in crew_tasks],
+    )
+
+
+def _checkout(project_id: int, key: str) -> Optional[_CompiledCrew]:
+    with _crew_lock:
+        entry = _crew_cache.get(project_id)
+        if entry is not None and entry.key == key:
+            return entry.idle.pop() if entry.idle else None
+        # The project changed (or is new): crews built from the old definition are dropped
+        _crew_cache.pop(project_id, None)
+        if len(_crew_cache) >= CREW_CACHE_MAX:
+            _crew_cache.pop(next(iter(_crew_cache)))
+        _crew_cache[project_id] = _CachedCrews(key, [])
+        return None
+
+
+def _checkin(project_id: int, key: str, compiled: _CompiledCrew) -> None:
+    with _crew_lock:
+        entry = _crew_cache.get(project_id)
+        if entry is not None and entry.key == key and len(entry.idle) < CREW_CACHE_IDLE:
+            entry.idle.append(compiled)
+
+
+def _apply_inputs(compiled: _CompiledCrew, inputs: Dict[str, Any]) -> None:
+    """Reset the crew texts to the compiled ones with this run's inputs applied.
+
+    CrewAI keeps the text it interpolated on the first kickoff and leaves the previous run's
+    text in place when a run has no inputs, so both are reset before every run.
+    """
+    for agent, (role, goal, backstory) in zip(compiled.crew.agents, compiled.agent_texts):
+        agent.role, agent.goal, agent.backstory = role, goal, backstory
+        agent._original_role = agent._original_goal = agent._original_backstory = None
+    for task, (description, expected_output) in zip(compiled.crew.tasks, compiled.task_texts):
+        # Simple template formatting with inputs
+        try:
+            if inputs:
+                description = description.format(**inputs)
+        except Exception:
+            pass
+        task.description, task.expected_output = description, expected_output
+        task._original_description = task._original_expected_output = None
+
+
+def _reset_run_state(crew: Crew) -> None:
+    """Clear what a previous kickoff left on a reused crew.
+
+    Without this the next run would read the last run's tool results from the shared cache
+    (and an agent's ``result_as_answer`` tool output), start with the old task outputs and
+    keep counting tool errors, delegations and retries from where the last run stopped.
+    """
+    cache = CacheHandler()
+    crew._cache_handler = cache
+    for agent in crew.agents:
+        # Also gives the agent a fresh tools handler and executor
+        agent.set_cache_handler(cache)
+        agent.tools_results = []
+        agent._times_executed = 0
+    for task in crew.tasks:
+        task.output = None
+        task.tools_errors = task.delegations = task.used_tools = task.retry_count = 0
+        task.processed_by_agents = set()
+        task.start_time = task.end_time = None
+
+
+def execute(project, agents, tasks, inputs: Dict[str, Any], execution_language: str = None, on_log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    # Get language instruction - use execution language if provided, otherwise use project language
+    language = execution_language or getattr(project, 'language', 'pt-br')
+    key = crew_key(project, agents, tasks, language)
+    compiled = _checkout(project.id, key)
+    if compiled is None:
+        compiled = compile_crew(project, agents, tasks, language)
+    else:
+        _reset_run_state(compiled.crew)
+    _apply_inputs(compiled, inputs)
+    crew = compiled.crew
 
     # capture logs
     buf = _CallbackIO(on_log)
-    with contextlib.redirect_stdout(buf):
+    with _capture_stdout(buf):
         try:
             result = crew.kickoff(inputs or {})
             logs = buf.getvalue()
+            # Only a crew that finished cleanly is reused
+            _checkin(project.id, key, compiled)
             return {"status": "completed", "result": str(result), "logs": logs}
         except Exception as e:
             logs = buf.getvalue() + f"\n[ERROR] {e}"
             return {"status": "error", "result": "", "logs": logs}
 
 
-def execute_in_background(execution_id: int, project_id: int, inputs: Dict[str, Any], execution_language: Optional[str] = None):
-    """Background entry to execute a project and update DB incrementally."""
+def fail_interrupted_executions() -> int:
+    """Mark executions whose process stopped while they were queued or running as failed.
+
+    Runs only live in the scheduler of the process that accepted them, so nothing would ever
+    finish them, and their single-flight keys would block new runs. Other API processes keep
+    renewing the leases of their own runs, so only leases older than EXECUTION_LEASE_TTL
+    are taken as interrupted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=EXECUTION_LEASE_TTL)
+    Execution = models.Execution
     db = SessionLocal()
     try:
-        project = db.query(models.Project).filter_by(id=project_id).first()
-        agents = db.query(models.Agent).filter_by(project_id=project_id).all()
-        tasks = db.query(models.Task).filter_by(project_id=project_id).all()
+        count = db.query(Execution).filter(
+            Execution.status.in_(("created", "running")),
+            or_(
+                Execution.heartbeat_at < cutoff,
+                # Rows created before executions had leases
+                and_(Execution.heartbeat_at.is_(None), Execution.created_at < cutoff),
+            ),
+        ).update(
+            {
+                Execution.status: "error",
+                Execution.finished_at: func.now(),
+                Execution.flight_key: None,
+                Execution.output_payload: {"error": "Interrupted by a server restart"},
+                Execution.logs: func.coalesce(Execution.logs, "") + "\n[ERROR] Interrupted by a server restart",
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def renew_execution_leases() -> int:
+    """Refresh the lease of the executions this process has queued or running."""
+    db = SessionLocal()
+    try:
+        count = db.query(models.Execution).filter(
+            models.Execution.runner == RUNNER_ID,
+            models.Execution.status.in_(("created", "running")),
+        ).update({models.Execution.heartbeat_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
 
-        def on_log(chunk: str):
+
+class _LeaseKeeper:
+    """Background thread renewing this process's leases and failing executions of stopped processes."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="execution-leases", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while True:
             try:
-                exe = db.query(models.Execution).filter_by(id=execution_id).first()
-                if not exe:
-                    return
-                exe.logs = (exe.logs or "") + chunk
-                db.add(exe)
-                db.commit()
+                renew_execution_leases()
+                fail_interrupted_executions()
             except Exception:
-                # Ignore logging errors to prevent execution failure
+                # A database hiccup only delays the next renewal
                 pass
+            if self._stop.wait(EXECUTION_HEARTBEAT_INTERVAL):
+                return
+
+
+lease_keeper = _LeaseKeeper()
+
+
+def execute_in_background(execution_id: int, project_id: int, inputs: Dict[str, Any], execution_language: Optional[str] = None):
+    """Background entry to execute a project and update DB incrementally."""
+    db = SessionLocal()
+    try:
+        project = db.query(models.Project).filter_by(id=project_id).first()
+        agents = db.query(models.Agent).filter_by(project_id=project_id).all()
+        tasks = db.query(models.Task).filter_by(project_id=project_id).order_by(models.Task.id).all()
+        db.query(models.Execution).filter_by(id=execution_id).update({models.Execution.status: "running"})
+        db.commit()
 
+        log_writer = _LogWriter(execution_id)
+        started = time.monotonic()
         try:
-            result = execute(project, agents, tasks, inputs, execution_language, on_log=on_log)
+            try:
+                result = execute(project, agents, tasks, inputs, execution_language, on_log=log_writer.write)
+            finally:
+                log_writer.close()
             exe = db.query(models.Execution).filter_by(id=execution_id).first()
             if exe:
                 exe.status = result.get("status", "completed")
+                exe.finished_at = func.now()
+                exe.flight_key = None
                 if result.get("status") == "error":
                     logs_blob = result.get("logs") or ""
                     log_tail = logs_blob.splitlines()
@@ -143,15 +474,19 @@ def execute_in_background(execution_id: int, project_id: int, inputs: Dict[str,
                     exe.output_payload = {"result": result.get("result", "")}
                 exe.logs = result.get("logs", exe.logs or "")
                 db.add(exe)
+                record_execution(db, project_id, exe.status, (time.monotonic() - started) * 1000)
                 db.commit()
         except Exception as e:
             # Handle execution errors and update status
             exe = db.query(models.Execution).filter_by(id=execution_id).first()
             if exe:
                 exe.status = "error"
+                exe.finished_at = func.now()
+                exe.flight_key = None
                 exe.output_payload = {"error": str(e)}
                 exe.logs = (exe.logs or "") + f"\n[ERROR] Execution failed: {str(e)}"
                 db.add(exe)
+                record_execution(db, project_id, exe.status, (time.monotonic() - started) * 1000)
                 db.commit()
     except Exception as e:
         # Handle database connection errors
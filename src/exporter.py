@@ -1,8 +1,35 @@
+"""Project export as a CrewAI ZIP (project.json, agents/tasks YAML, crew.py, README).
+
+The archive is produced chunk by chunk (``iter_zip``) so it can be streamed straight to
+the HTTP response, and finished archives are kept per worker keyed by the project's
+creation stamp and ``content_version``: re-downloading an unchanged project skips the
+YAML/code generation and compression entirely.
+"""
 import os
+import re
+import threading
+import time
 import zipfile
-import yaml
+from collections import defaultdict
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db import models
+from db.content_version import created_stamp
+from . import yaml_io
+from .task_graph import task_links
 from .yaml_generator import to_yaml_agents, to_yaml_tasks
 
+# Per-worker cache of built exports: max entries and max size of one archive
+EXPORT_CACHE_MAX = int(os.getenv("EXPORT_CACHE_MAX", "256"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# Rows fetched per round trip by the workspace export
+EXPORT_ALL_BATCH_SIZE = int(os.getenv("EXPORT_ALL_BATCH_SIZE", "200"))
+
 TEMPLATE_CREW = """from crewai import Agent, Task, Crew, Process
 from tools import available_tools
 
@@ -28,10 +55,11 @@ TEMPLATE_AGENT = """agents.append(Agent(
 TEMPLATE_TASK = """task_{tid} = Task(
     description={desc!r},
     expected_output={exp!r},
-    agent=agents[{aidx}]
+    agent=agents[{aidx}]{links}
 )"""
 
-def export_project_zip(project, agents, tasks, output_path: str):
+def project_files(project, agents, tasks) -> List[Tuple[str, str]]:
+    """(archive name, text) of every file of the export, in archive order."""
     agents_by_id = {a.id: a for a in agents}
     agents_yaml = to_yaml_agents(agents)
     tasks_yaml = to_yaml_tasks(tasks, agents_by_id)
@@ -59,10 +87,13 @@ def export_project_zip(project, agents, tasks, output_path: str):
     # Generate task blocks
     tb = []
     id_to_idx = {a.id: i for i, a in enumerate(agents)}
-    for t in tasks:
+    for t, (async_execution, context) in zip(tasks, task_links(tasks)):
+        links = ",\n    async_execution=True" if async_execution else ""
+        if context:
+            links += ",\n    context=[" + ", ".join(f"task_{tasks[j].id}" for j in context) + "]"
         tb.append(TEMPLATE_TASK.format(
             tid=t.id, desc=t.description, exp=t.expected_output or "",
-            aidx=id_to_idx.get(t.agent_id, 0)
+            aidx=id_to_idx.get(t.agent_id, 0), links=links
         ))
 
     crew_py = TEMPLATE_CREW.format(
@@ -73,16 +104,7 @@ def export_project_zip(project, agents, tasks, output_path: str):
 
     main_py = "from crew import crew\n\nif __name__ == '__main__':\n    print(crew.kickoff())\n"
     tools_py = "from src.tools_config import available_tools\n"
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as z:
-        z.writestr("project.json", yaml.safe_dump(project_json, allow_unicode=True, sort_keys=False))
-        z.writestr("agents.yaml", agents_yaml)
-        z.writestr("tasks.yaml", tasks_yaml)
-        z.writestr("crew.py", crew_py)
-        z.writestr("main.py", main_py)
-        z.writestr("tools.py", tools_py)
-        z.writestr("README.md", f"""# {project.name}
+    readme = f"""# {project.name}
 
 {project.description}
 
@@ -107,6 +129,183 @@ python main.py
 ```
 
 Exported from Crew AI Studio
-""")
+"""
+    return [
+        ("project.json", yaml_io.dump(project_json)),
+        ("agents.yaml", agents_yaml),
+        ("tasks.yaml", tasks_yaml),
+        ("crew.py", crew_py),
+        ("main.py", main_py),
+        ("tools.py", tools_py),
+        ("README.md", readme),
+    ]
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object for ZipFile that hands out what was written."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: Iterable[Tuple[str, object]]) -> Iterator[bytes]:
+    """Deflated ZIP of ``files`` yielded chunk by chunk, one or more chunks per member.
+
+    Members are (name, str | bytes | iterable of bytes); iterables are copied in pieces so
+    large members never sit in memory whole. Nested ``.zip`` members are stored, not
+    deflated again. No temporary file is involved: ZipFile writes data descriptors when
+    its output is not seekable.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, content in files:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED if name.endswith(".zip") else zipfile.ZIP_DEFLATED
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            if isinstance(content, bytes):
+                z.writestr(info, content)
+            else:
+                with z.open(info, "w", force_zip64=True) as member:
+                    for piece in content:
+                        member.write(piece)
+                        chunk = sink.take()
+                        if chunk:
+                            yield chunk
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    chunk = sink.take()
+    if chunk:
+        yield chunk
+
+
+class _CachedExport(NamedTuple):
+    stamp: int
+    content_version: int
+    data: bytes
+
+
+_export_cache: Dict[int, _CachedExport] = {}
+_export_lock = threading.Lock()
+
+
+def export_version(project) -> str:
+    """Identifies one version of one project, also across a deleted project whose id was reused."""
+    return f"{project.id}-{created_stamp(project.created_at)}-{project.content_version}"
+
+
+def cached_export(project) -> Optional[bytes]:
+    """Archive built earlier for this exact project version, if this worker still has it."""
+    hit = _export_cache.get(project.id)
+    version = (created_stamp(project.created_at), project.content_version)
+    if hit is not None and (hit.stamp, hit.content_version) == version:
+        return hit.data
+    return None
+
+
+def evict_export(project_id: int) -> None:
+    with _export_lock:
+        _export_cache.pop(project_id, None)
+
+
+def _cache_when_complete(project_id: int, stamp: int, content_version: int, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    kept: Optional[List[bytes]] = []
+    size = 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            kept = kept if size <= EXPORT_CACHE_MAX_BYTES else None
+            if kept is not None:
+                kept.append(chunk)
+        yield chunk
+    # Only archives that were sent completely get cached
+    if kept is not None:
+        with _export_lock:
+            _export_cache.pop(project_id, None)
+            if len(_export_cache) >= EXPORT_CACHE_MAX:
+                _export_cache.pop(next(iter(_export_cache)))
+            _export_cache[project_id] = _CachedExport(stamp, content_version, b"".join(kept))
+
+
+def iter_project_zip(project, agents, tasks) -> Iterator[bytes]:
+    """Stream the project's export and keep the finished archive in the export cache.
+
+    The files are generated right away, while the ORM objects are still attached; only the
+    compression is deferred to the iteration. ``project.content_version`` must be read
+    before agents and tasks are loaded: an edit in between then only makes the next
+    download rebuild instead of serving stale content.
+    """
+    files = project_files(project, agents, tasks)
+    stamp = created_stamp(project.created_at)
+    return _cache_when_complete(project.id, stamp, project.content_version, iter_zip(files))
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^\w-]+", "_", name).strip("_").lower()[:60] or "project"
+
+
+def _project_archives(db: Session, batch_size: int) -> Iterator[Tuple[str, bytes]]:
+    """(member name, project export ZIP) for every project, loading one batch at a time."""
+    result = db.execute(
+        select(models.Project).order_by(models.Project.id).execution_options(yield_per=batch_size)
+    )
+    for projects in result.scalars().partitions():
+        ids = [p.id for p in projects]
+        agents: Dict[int, List[models.Agent]] = defaultdict(list)
+        tasks: Dict[int, List[models.Task]] = defaultdict(list)
+        for agent in db.scalars(select(models.Agent).where(models.Agent.project_id.in_(ids)).order_by(models.Agent.id)):
+            agents[agent.project_id].append(agent)
+        for task in db.scalars(select(models.Task).where(models.Task.project_id.in_(ids)).order_by(models.Task.id)):
+            tasks[task.project_id].append(task)
+        for project in projects:
+            data = cached_export(project)
+            if data is None:
+                data = b"".join(iter_zip(project_files(project, agents[project.id], tasks[project.id])))
+            yield f"projects/{project.id}_{_slug(project.name)}.zip", data
+
+
+def _execution_lines(db: Session, batch_size: int) -> Iterator[bytes]:
+    """Execution history as NDJSON, one batch of rows per piece."""
+    columns = [
+        models.Execution.id, models.Execution.project_id, models.Execution.status,
+        models.Execution.input_payload, models.Execution.output_payload, models.Execution.logs,
+        models.Execution.created_at, models.Execution.finished_at,
+    ]
+    result = db.execute(select(*columns).order_by(models.Execution.id).execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        yield b"".join(orjson.dumps(dict(row._mapping)) + b"\n" for row in rows)
+
+
+def iter_workspace_zip(
+    session_factory: Callable[[], Session],
+    include_executions: bool = False,
+    batch_size: int = EXPORT_ALL_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Every project as ``projects/<id>_<name>.zip`` (the single-project export format, so
+    the backup can be restored with POST /import/bulk), plus ``executions.ndjson``.
 
-    return output_path
+    Rows are read with ``yield_per`` in batches of ``batch_size`` and members are
+    compressed as they are produced, so memory does not grow with the number of projects.
+    The session is opened here because the generator outlives the request handler.
+    """
+    db = session_factory()
+    try:
+        files: Iterable[Tuple[str, object]] = _project_archives(db, batch_size)
+        if include_executions:
+            files = chain(files, [("executions.ndjson", _execution_lines(db, batch_size))])
+        yield from iter_zip(files)
+    finally:
+        db.close()
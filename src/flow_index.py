@@ -0,0 +1,206 @@
+"""Similarity index over the flows (agents + tasks) of every project.
+
+Each project is turned into one document (name, description, agent names/roles/goals and
+task descriptions/expected outputs) and embedded offline with a hashing vectorizer:
+accent-folded unigrams and bigrams are hashed into ``DIM`` buckets with sublinear term
+frequencies, and IDF weights are derived from the indexed projects at query time. Search
+is a single matrix-vector product over L2-normalized rows.
+
+The raw term-frequency matrix is persisted to ``FLOW_INDEX_PATH`` together with the
+``projects.content_version`` and creation stamp each row was built from, so a restart only
+re-embeds the projects that changed since the file was written, and a project that took
+over the id of a deleted one is never mistaken for it.
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db import models
+from db.content_version import created_stamp
+
+DIM = 1 << 11
+FLOW_INDEX_PATH = os.getenv("FLOW_INDEX_PATH", "./flow_index.npz")
+# Seconds between checks of projects.content_version for changed projects
+FLOW_INDEX_REFRESH_SECONDS = float(os.getenv("FLOW_INDEX_REFRESH_SECONDS", "5"))
+_CHUNK = 500
+_WORD = re.compile(r"[a-z0-9]+")
+# Accent-folded function words (pt/en/es) that would otherwise dominate short prompts
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das no na nos nas em por para pra com sem sobre e ou
+que se ao aos como mais muito cada seu sua seus suas este esta isso eu quero preciso ser
+the an of to in on for with and or is are be by from this that it as at into each my
+el la los las del al con y un una es por lo
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [w for w in _WORD.findall(folded) if len(w) > 1 and w not in STOPWORDS]
+
+
+def term_frequencies(text: str) -> np.ndarray:
+    """Hashed, sublinear (1 + log tf) unigram + bigram counts of ``text``."""
+    words = tokenize(text)
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    vec = np.zeros(DIM, dtype=np.float32)
+    for feature, count in features.items():
+        vec[zlib.crc32(feature.encode()) % DIM] += 1.0 + math.log(count)
+    return vec
+
+
+def flow_documents(db: Session, project_ids: Sequence[int]) -> Dict[int, str]:
+    """Text of each project's flow, loaded with three grouped queries per chunk of ids."""
+    docs: Dict[int, List[str]] = {}
+    for start in range(0, len(project_ids), _CHUNK):
+        chunk = project_ids[start:start + _CHUNK]
+        for pid, name, description in db.execute(
+            select(models.Project.id, models.Project.name, models.Project.description)
+            .where(models.Project.id.in_(chunk))
+        ):
+            docs[pid] = [name or "", description or ""]
+        for pid, name, role, goal in db.execute(
+            select(models.Agent.project_id, models.Agent.name, models.Agent.role, models.Agent.goal)
+            .where(models.Agent.project_id.in_(chunk))
+        ):
+            if pid in docs:
+                docs[pid].extend((name or "", role or "", goal or ""))
+        for pid, description, expected in db.execute(
+            select(models.Task.project_id, models.Task.description, models.Task.expected_output)
+            .where(models.Task.project_id.in_(chunk))
+        ):
+            if pid in docs:
+                docs[pid].extend((description or "", expected or ""))
+    return {pid: "\n".join(parts) for pid, parts in docs.items()}
+
+
+class FlowIndex:
+    def __init__(self, path: Optional[str] = FLOW_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._stamps = np.zeros(0, dtype=np.int64)
+        self._tf = np.zeros((0, DIM), dtype=np.float32)
+        self._weighted: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._checked_at = float("-inf")
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ----- persistence -----
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if data["tf"].shape[1] != DIM:
+                    return
+                self._ids, self._versions, self._tf = data["ids"], data["versions"], data["tf"]
+                self._stamps = data["stamps"]
+        except Exception:
+            # Unreadable or older file: start empty, the next refresh rebuilds it
+            return
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, ids=self._ids, versions=self._versions, stamps=self._stamps, tf=self._tf)
+        os.replace(tmp, self.path)
+
+    # ----- maintenance -----
+
+    def refresh(self, db: Session, force: bool = False) -> int:
+        """Re-embed projects whose content_version or creation stamp changed and drop deleted ones.
+
+        Checks at most every FLOW_INDEX_REFRESH_SECONDS unless ``force``. Returns the number of
+        rows added, replaced or removed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < FLOW_INDEX_REFRESH_SECONDS:
+                return 0
+            current = {
+                pid: (created_stamp(created_at), version)
+                for pid, created_at, version in db.execute(
+                    select(models.Project.id, models.Project.created_at, models.Project.content_version)
+                )
+            }
+            known = dict(zip(self._ids.tolist(), zip(self._stamps.tolist(), self._versions.tolist())))
+            stale = [pid for pid, state in current.items() if known.get(pid) != state]
+            removed = known.keys() - current.keys()
+            if stale or removed:
+                self._apply(current, stale, flow_documents(db, stale))
+                self._save()
+            self._checked_at = now
+            return len(stale) + len(removed)
+
+    def _apply(self, current: Dict[int, Tuple[int, int]], stale: List[int], docs: Dict[int, str]) -> None:
+        stale_set = set(stale)
+        keep = np.array([pid in current and pid not in stale_set for pid in self._ids.tolist()], dtype=bool)
+        fresh = [pid for pid in stale if pid in docs]
+        new_tf = np.stack([term_frequencies(docs[pid]) for pid in fresh]) if fresh else np.zeros((0, DIM), np.float32)
+        self._ids = np.concatenate([self._ids[keep], np.array(fresh, dtype=np.int64)])
+        self._versions = np.concatenate([self._versions[keep], np.array([current[p][1] for p in fresh], dtype=np.int64)])
+        self._stamps = np.concatenate([self._stamps[keep], np.array([current[p][0] for p in fresh], dtype=np.int64)])
+        self._tf = np.concatenate([self._tf[keep], new_tf])
+        self._weighted = None
+
+    def _matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._weighted is None:
+            n = len(self._ids)
+            df = np.count_nonzero(self._tf, axis=0)
+            self._idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+            weighted = self._tf * self._idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            self._weighted = weighted / np.maximum(norms, 1e-12)
+        return self._weighted, self._idf
+
+    # ----- queries -----
+
+    def search(self, text: str, k: int = 5, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Top-``k`` (project_id, cosine score) pairs for ``text``, best first."""
+        with self._lock:
+            if not len(self._ids):
+                return []
+            matrix, idf = self._matrix()
+            ids = self._ids
+        query = term_frequencies(text) * idf
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        scores = matrix @ (query / norm)
+        excluded = set(exclude)
+        if excluded:
+            scores = np.where(np.isin(ids, list(excluded)), -1.0, scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in top if scores[i] > 0]
+
+
+_index: Optional[FlowIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_flow_index() -> FlowIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FlowIndex()
+        return _index
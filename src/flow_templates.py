@@ -0,0 +1,191 @@
+"""Library of prompt-to-flow templates loaded from YAML files.
+
+Every ``*.yaml`` file in ``FLOW_TEMPLATES_DIR`` describes one flow (agents, tasks and the
+process shown in the builder plan) plus the keyword groups that select it::
+
+    type: sentiment_analysis
+    title: Análise de Sentimentos
+    match:
+      min_score: 4
+      groups:
+        - {weight: 3, required: true, keywords: [sentiment*, emoc*]}
+        - {weight: 1, keywords: [comentario*, feedback]}
+
+Keywords are accent-folded and lower-cased; a trailing ``*`` makes it a prefix match.
+A template matches when all its required groups are hit and the summed weights of the
+hit groups reach ``min_score``. All keywords are compiled into one inverted index at
+load time, so matching costs a dictionary lookup per prompt token (and per prefix of
+it) regardless of how many templates exist. The library reloads itself when files are
+added, removed or edited.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from . import yaml_io
+from .flow_index import tokenize
+
+FLOW_TEMPLATES_DIR = os.getenv(
+    "FLOW_TEMPLATES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "flows"),
+)
+# Seconds between checks of the template files for changes
+RELOAD_CHECK_SECONDS = 2.0
+MIN_PREFIX = 3
+
+
+@dataclass
+class FlowTemplate:
+    type: str
+    title: str
+    agents: List[Dict[str, Any]]
+    tasks: List[Dict[str, Any]]
+    process: List[str]
+    min_score: float
+    weights: List[float]
+    required: Set[int]
+    source: str = ""
+
+    def as_analysis(self, score: float) -> Dict[str, Any]:
+        return {
+            "detected_type": self.type,
+            "title": self.title,
+            "score": score,
+            "process": list(self.process),
+            "agents": [dict(a) for a in self.agents],
+            "tasks": [dict(t) for t in self.tasks],
+        }
+
+
+def _keyword(raw: str) -> Tuple[str, bool]:
+    prefix = raw.endswith("*")
+    words = tokenize(raw.rstrip("*"))
+    if len(words) != 1:
+        raise ValueError(f"keyword {raw!r} must be a single non-stopword word")
+    if prefix and len(words[0]) < MIN_PREFIX:
+        raise ValueError(f"prefix keyword {raw!r} must have at least {MIN_PREFIX} letters")
+    return words[0], prefix
+
+
+def parse_template(data: Dict[str, Any], source: str = "") -> Tuple[FlowTemplate, List[List[Tuple[str, bool]]]]:
+    """Validate one template document; returns it with its compiled keyword groups."""
+    match = data.get("match") or {}
+    groups = match.get("groups") or []
+    if not data.get("type") or not data.get("agents") or not groups:
+        raise ValueError("template needs 'type', 'agents' and 'match.groups'")
+    agents = data["agents"]
+    tasks = data.get("tasks") or []
+    for agent in agents:
+        missing = {"name", "role", "goal"} - agent.keys()
+        if missing:
+            raise ValueError(f"agent {agent.get('name')!r} is missing {sorted(missing)}")
+    for task in tasks:
+        if not task.get("description") or task.get("agent_idx", 0) >= len(agents):
+            raise ValueError("every task needs a description and a valid agent_idx")
+    template = FlowTemplate(
+        type=str(data["type"]),
+        title=str(data.get("title") or data["type"]),
+        agents=agents,
+        tasks=tasks,
+        process=[str(p) for p in data.get("process") or []],
+        min_score=float(match.get("min_score", 1)),
+        weights=[float(g.get("weight", 1)) for g in groups],
+        required={i for i, g in enumerate(groups) if g.get("required")},
+        source=source,
+    )
+    compiled = [[_keyword(str(k)) for k in g.get("keywords") or []] for g in groups]
+    return template, compiled
+
+
+class TemplateLibrary:
+    def __init__(self, directory: str = FLOW_TEMPLATES_DIR):
+        self.directory = directory
+        # (templates, exact keyword postings, prefix keyword postings), swapped as a whole on reload
+        self._state: Tuple[List[FlowTemplate], Dict, Dict] = ([], {}, {})
+        self._signature: Optional[Tuple] = None
+        self._checked_at = float("-inf")
+        # Incremented on every (re)load so callers can key caches on the library contents
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def templates(self) -> List[FlowTemplate]:
+        return self._state[0]
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith((".yaml", ".yml"))
+        )
+
+    def _current_signature(self) -> Tuple:
+        return tuple((path, os.stat(path).st_mtime_ns) for path in self._files())
+
+    def load(self) -> None:
+        templates: List[FlowTemplate] = []
+        exact: Dict[str, List[Tuple[int, int]]] = {}
+        prefix: Dict[str, List[Tuple[int, int]]] = {}
+        signature = self._current_signature()
+        for path, _ in signature:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    template, groups = parse_template(yaml_io.load(f) or {}, source=os.path.basename(path))
+            except Exception as e:
+                print(f"Warning: skipping flow template {path}: {e}")
+                continue
+            for g_idx, keywords in enumerate(groups):
+                for word, is_prefix in keywords:
+                    (prefix if is_prefix else exact).setdefault(word, []).append((len(templates), g_idx))
+            templates.append(template)
+        self._state = (templates, exact, prefix)
+        self._signature = signature
+        self.generation += 1
+
+    def reload_if_changed(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._signature is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+                return
+            self._checked_at = now
+            if self._signature is None or self._current_signature() != self._signature:
+                self.load()
+
+    def match(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Best matching template for ``prompt`` as an analysis dict, or None."""
+        templates, exact, prefix = self._state
+        hits: Dict[int, Set[int]] = {}
+        for token in set(tokenize(prompt)):
+            postings = list(exact.get(token, ()))
+            for end in range(MIN_PREFIX, len(token) + 1):
+                postings.extend(prefix.get(token[:end], ()))
+            for t_idx, g_idx in postings:
+                hits.setdefault(t_idx, set()).add(g_idx)
+
+        best: Optional[Tuple[float, int]] = None
+        for t_idx, groups in hits.items():
+            template = templates[t_idx]
+            if not template.required <= groups:
+                continue
+            score = sum(template.weights[g] for g in groups)
+            if score < template.min_score:
+                continue
+            # Ties go to the template loaded first (file name order)
+            if best is None or score > best[0] or (score == best[0] and t_idx < best[1]):
+                best = (score, t_idx)
+        if best is None:
+            return None
+        return templates[best[1]].as_analysis(best[0])
+
+
+_library: Optional[TemplateLibrary] = None
+
+
+def get_template_library() -> TemplateLibrary:
+    global _library
+    if _library is None:
+        _library = TemplateLibrary()
+    _library.reload_if_changed()
+    return _library
@@ -0,0 +1,241 @@
+"""Persist imported projects with bulk statements.
+
+Single-file imports and bulk archives both end up in ``import_projects``: projects, agents
+and tasks are written with one multi-row INSERT per table per batch, and each batch is its
+own transaction. The sha256 of every imported file is recorded in ``import_artifacts`` so
+importing the same bytes again returns the existing project without touching it.
+"""
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from src.settings import get_setting
+from db import models
+from db.bulk import insert_returning_ids
+
+IMPORT_BULK_BATCH_SIZE = int(os.getenv("IMPORT_BULK_BATCH_SIZE", "50"))
+
+
+@dataclass
+class ImportDefaults:
+    model_provider: str
+    model_name: str
+    override: bool
+
+    @classmethod
+    def from_settings(cls, db: Optional[Session] = None) -> "ImportDefaults":
+        return cls(
+            model_provider=get_setting(db, 'DEFAULT_PROVIDER', 'openrouter'),
+            model_name=get_setting(db, 'DEFAULT_MODEL', 'openrouter/gpt-4o-mini'),
+            override=get_setting(db, 'IMPORT_OVERRIDE_MODEL', 'false').lower() in ('1', 'true', 'yes', 'on'),
+        )
+
+
+def _agent_row(project_id: int, agent: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project_id": project_id,
+        "name": agent.get("name", "Unknown"),
+        "role": agent.get("role", "Unknown"),
+        "goal": agent.get("goal", ""),
+        "backstory": agent.get("backstory", ""),
+        "tools": agent.get("tools", []),
+        "verbose": agent.get("verbose", True),
+        "memory": agent.get("memory", False),
+        "allow_delegation": agent.get("allow_delegation", False),
+    }
+
+
+def _task_row(project_id: int, agent_id: int, task: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project_id": project_id,
+        "agent_id": agent_id,
+        "description": task.get("description", ""),
+        "expected_output": task.get("expected_output", ""),
+        "tools": task.get("tools", []),
+        "async_execution": task.get("async_execution", False),
+        "output_file": task.get("output_file", ""),
+    }
+
+
+def _task_rows(
+    project_id: int, tasks: Sequence[Dict[str, Any]], agent_name_to_id: Dict[str, int]
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Rows for the tasks whose 'agent' names a known agent (the others are skipped), with
+    the position in ``tasks`` of each row."""
+    rows, positions = [], []
+    for pos, task in enumerate(tasks):
+        if task.get("agent") in agent_name_to_id:
+            rows.append(_task_row(project_id, agent_name_to_id[task["agent"]], task))
+            positions.append(pos)
+    return rows, positions
+
+
+def link_task_context(
+    db: Session, specs: Sequence[Dict[str, Any]], positions: Sequence[int], task_ids: Sequence[int]
+) -> None:
+    """Store each spec's ``context`` (positions in ``specs``) as ids of the inserted tasks.
+
+    ``positions[i]`` is the spec position of the task inserted as ``task_ids[i]``. References
+    to skipped tasks or to tasks that do not come earlier are dropped.
+    """
+    id_at = dict(zip(positions, task_ids))
+    changes = []
+    for pos, task_id in zip(positions, task_ids):
+        context = [
+            id_at[p] for p in specs[pos].get("context") or []
+            if isinstance(p, int) and p < pos and p in id_at
+        ]
+        if context:
+            changes.append({"id": task_id, "context": context})
+    if changes:
+        db.execute(update(models.Task), changes)
+
+
+def insert_agents_and_tasks(
+    db: Session,
+    project_id: int,
+    agents: Sequence[Dict[str, Any]],
+    tasks: Sequence[Dict[str, Any]],
+    agent_name_to_id: Optional[Dict[str, int]] = None,
+) -> Tuple[int, int]:
+    """Add agents, then tasks bound to them (or to ``agent_name_to_id``); caller commits."""
+    agent_rows = [_agent_row(project_id, a) for a in agents]
+    names = dict(agent_name_to_id or {})
+    names.update(zip((r["name"] for r in agent_rows), insert_returning_ids(db, models.Agent, agent_rows)))
+    task_rows, positions = _task_rows(project_id, tasks, names)
+    link_task_context(db, tasks, positions, insert_returning_ids(db, models.Task, task_rows))
+    return len(agent_rows), len(task_rows)
+
+
+def find_imported(db: Session, hashes: Iterable[str]) -> Dict[str, Tuple[int, str]]:
+    """content_hash -> (project id, name) for previously imported files whose project still exists."""
+    hashes = [h for h in set(hashes) if h]
+    if not hashes:
+        return {}
+    rows = db.execute(
+        select(models.ImportArtifact.content_hash, models.Project.id, models.Project.name)
+        .join(models.Project, models.Project.id == models.ImportArtifact.project_id)
+        .where(models.ImportArtifact.content_hash.in_(hashes))
+    )
+    return {h: (pid, name) for h, pid, name in rows}
+
+
+def _unique_names(db: Session, wanted: List[str]) -> List[str]:
+    """Project names are unique: suffix ' (2)', ' (3)'... to names already taken."""
+    taken = set(db.scalars(select(models.Project.name).where(models.Project.name.in_(set(wanted)))))
+    result = []
+    for name in wanted:
+        final, n = name, 1
+        while final in taken:
+            n += 1
+            final = f"{name} ({n})"
+            if db.scalar(select(models.Project.id).where(models.Project.name == final)) is not None:
+                taken.add(final)
+        taken.add(final)
+        result.append(final)
+    return result
+
+
+def _import_batch(db: Session, batch: List[Dict[str, Any]], defaults: ImportDefaults) -> None:
+    specs = [item["project"] for item in batch]
+    names = _unique_names(db, [str(spec.get("name") or "Imported Project")[:200] for spec in specs])
+    project_rows = []
+    for spec, name in zip(specs, names):
+        project_rows.append({
+            "name": name,
+            "description": spec.get("description", ""),
+            "model_provider": defaults.model_provider if defaults.override else spec.get("model_provider", defaults.model_provider),
+            "model_name": defaults.model_name if defaults.override else spec.get("model_name", defaults.model_name),
+            "language": spec.get("language", "pt"),
+        })
+    project_ids = insert_returning_ids(db, models.Project, project_rows)
+
+    # All agents of the batch in one statement, then all tasks in another
+    agent_rows, owners = [], []
+    for idx, (spec, pid) in enumerate(zip(specs, project_ids)):
+        for agent in spec.get("agents") or []:
+            agent_rows.append(_agent_row(pid, agent))
+            owners.append(idx)
+    agent_ids = insert_returning_ids(db, models.Agent, agent_rows)
+    agent_maps: List[Dict[str, int]] = [{} for _ in specs]
+    for idx, row, agent_id in zip(owners, agent_rows, agent_ids):
+        agent_maps[idx][row["name"]] = agent_id
+    task_rows, task_positions = [], []
+    for idx, (spec, pid) in enumerate(zip(specs, project_ids)):
+        rows, positions = _task_rows(pid, spec.get("tasks") or [], agent_maps[idx])
+        batch[idx]["tasks"] = len(rows)
+        task_rows.extend(rows)
+        task_positions.extend(positions)
+    task_ids = insert_returning_ids(db, models.Task, task_rows)
+    # Context positions are per project; resolve them project by project
+    start = 0
+    for idx, spec in enumerate(specs):
+        end = start + batch[idx]["tasks"]
+        link_task_context(db, spec.get("tasks") or [], task_positions[start:end], task_ids[start:end])
+        start = end
+
+    artifacts = [
+        {"content_hash": item["content_hash"], "project_id": pid, "filename": str(item.get("filename") or "")[:255]}
+        for item, pid in zip(batch, project_ids) if item.get("content_hash")
+    ]
+    if artifacts:
+        db.execute(insert(models.ImportArtifact), artifacts)
+
+    agent_counts = Counter(owners)
+    for idx, (item, pid, name) in enumerate(zip(batch, project_ids, names)):
+        item.update(status="created", project_id=pid, name=name, agents=agent_counts[idx])
+
+
+def import_projects(
+    db: Session,
+    items: List[Dict[str, Any]],
+    defaults: ImportDefaults,
+    batch_size: int = IMPORT_BULK_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """Import parsed items ({filename, content_hash, project | error}); one transaction per batch.
+
+    Each item is returned updated with status ``created``, ``existing`` (same content already
+    imported) or ``error``, plus project_id, name and the agent/task counts.
+    """
+    known = find_imported(db, (item.get("content_hash") for item in items))
+    pending: List[Dict[str, Any]] = []
+    duplicates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    first_by_hash: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        item.setdefault("agents", 0)
+        item.setdefault("tasks", 0)
+        content_hash = item.get("content_hash")
+        if item.get("error") or not item.get("project"):
+            item["status"] = "error"
+            item.setdefault("error", "Nothing to import")
+        elif content_hash in known:
+            item["status"] = "existing"
+            item["project_id"], item["name"] = known[content_hash]
+        elif content_hash and content_hash in first_by_hash:
+            duplicates.append((item, first_by_hash[content_hash]))
+        else:
+            if content_hash:
+                first_by_hash[content_hash] = item
+            pending.append(item)
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            _import_batch(db, batch, defaults)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for item in batch:
+                item.update(status="error", error=f"Batch failed: {e}", project_id=None, agents=0, tasks=0)
+
+    # Same file twice in one upload: the later copies point at the first one's project
+    for item, first in duplicates:
+        if first.get("status") == "created":
+            item.update(status="existing", project_id=first["project_id"], name=first["name"])
+        else:
+            item.update(status="error", error=first.get("error"))
+    return items
@@ -0,0 +1,224 @@
+"""In-process execution scheduler with priority classes, per-project fair queuing and caps.
+
+Runs go to a fixed pool of ``EXECUTION_WORKERS`` threads. Interactive runs are always
+dispatched before batch runs. Within a class, projects share the workers by start-time fair
+queuing weighted by their expected run time, so a project with a thousand queued runs gets
+its share of the pool and no more, and no project runs more than its cap at once. Queue
+positions and estimated waits come from replaying that policy over the current queue.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+def _per_project(value: str) -> Dict[int, float]:
+    """'12:4,40:0.5' -> {12: 4.0, 40: 0.5}"""
+    result = {}
+    for part in value.split(","):
+        if ":" in part:
+            project_id, number = part.split(":", 1)
+            result[int(project_id)] = float(number)
+    return result
+
+
+EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", "4"))
+# Runs of one project executing at once; EXECUTION_PROJECT_CAPS overrides it per project
+EXECUTION_PROJECT_MAX_RUNNING = int(os.getenv("EXECUTION_PROJECT_MAX_RUNNING", "2"))
+EXECUTION_PROJECT_CAPS = {k: int(v) for k, v in _per_project(os.getenv("EXECUTION_PROJECT_CAPS", "")).items()}
+# Share of the workers a project gets when several have runs queued (default 1)
+EXECUTION_PROJECT_WEIGHTS = _per_project(os.getenv("EXECUTION_PROJECT_WEIGHTS", ""))
+# Assumed run time (s) of a project until one of its runs has finished
+EXECUTION_ESTIMATED_DURATION = float(os.getenv("EXECUTION_ESTIMATED_DURATION", "60"))
+
+PRIORITIES = ("interactive", "batch")
+# Weight of the newest run time in each project's moving average
+_DURATION_ALPHA = 0.3
+# Queue estimates are reused for this long (s) while the queue does not change
+_ESTIMATE_TTL = 1.0
+
+
+@dataclass(order=True)
+class _Job:
+    start: float
+    seq: int
+    execution_id: int = field(compare=False)
+    project_id: int = field(compare=False)
+    run: Callable[[], Any] = field(compare=False)
+
+
+class ExecutionScheduler:
+    def __init__(
+        self,
+        workers: int = EXECUTION_WORKERS,
+        max_running: int = EXECUTION_PROJECT_MAX_RUNNING,
+        caps: Optional[Dict[int, int]] = None,
+        weights: Optional[Dict[int, float]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.max_running = max(1, max_running)
+        self.caps = EXECUTION_PROJECT_CAPS if caps is None else caps
+        self.weights = EXECUTION_PROJECT_WEIGHTS if weights is None else weights
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._seq = itertools.count()
+        # Per priority class: queued runs per project (FIFO) and the class's virtual time
+        self._queues: Dict[str, Dict[int, Deque[_Job]]] = {p: {} for p in PRIORITIES}
+        self._virtual: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._last_finish: Dict[Tuple[str, int], float] = {}
+        # execution id -> (job, monotonic start) for runs in progress
+        self._running: Dict[int, Tuple[_Job, float]] = {}
+        self._running_per_project: Dict[int, int] = {}
+        self._durations: Dict[int, float] = {}
+        self._version = 0
+        self._estimates: Tuple[int, float, Dict[int, Tuple[int, float]]] = (-1, 0.0, {})
+
+    # ----- policy -----
+
+    def cap(self, project_id: int) -> int:
+        return self.caps.get(project_id, self.max_running)
+
+    def expected_duration(self, project_id: int) -> float:
+        return self._durations.get(project_id, EXECUTION_ESTIMATED_DURATION)
+
+    def _pick(self, queues: Dict[str, Dict[int, Deque[_Job]]], running: Dict[int, int]) -> Optional[Tuple[str, _Job]]:
+        """Next run to dispatch: first class with a dispatchable run, lowest start tag within it."""
+        for priority in PRIORITIES:
+            heads = [
+                q[0] for project_id, q in queues[priority].items()
+                if q and running.get(project_id, 0) < self.cap(project_id)
+            ]
+            if heads:
+                return priority, min(heads)
+        return None
+
+    # ----- queue -----
+
+    def submit(self, execution_id: int, project_id: int, run: Callable[[], Any], priority: str = "interactive") -> None:
+        """Queue ``run`` (which executes ``execution_id``) under ``project_id``'s share."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        with self._cond:
+            self._start_workers()
+            cost = self.expected_duration(project_id) / self.weights.get(project_id, 1.0)
+            start = max(self._virtual[priority], self._last_finish.get((priority, project_id), 0.0))
+            self._last_finish[(priority, project_id)] = start + cost
+            job = _Job(start, next(self._seq), execution_id, project_id, run)
+            self._queues[priority].setdefault(project_id, deque()).append(job)
+            self._version += 1
+            self._cond.notify()
+
+    def _start_workers(self) -> None:
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"execution-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take(self) -> _Job:
+        with self._cond:
+            while True:
+                picked = self._pick(self._queues, self._running_per_project)
+                if picked:
+                    break
+                self._cond.wait()
+            priority, job = picked
+            queue = self._queues[priority][job.project_id]
+            queue.popleft()
+            if not queue:
+                del self._queues[priority][job.project_id]
+            self._virtual[priority] = job.start
+            keys = [k for k in self._last_finish if k[0] == priority]
+            if not self._queues[priority]:
+                # Nothing left queued in the class: projects start level again from its last finish tag
+                self._virtual[priority] = max([self._last_finish.pop(k) for k in keys], default=job.start)
+            else:
+                # Finish tags at or below the virtual time no longer change any start tag
+                for key in keys:
+                    if self._last_finish[key] <= job.start:
+                        del self._last_finish[key]
+            self._running[job.execution_id] = (job, time.monotonic())
+            self._running_per_project[job.project_id] = self._running_per_project.get(job.project_id, 0) + 1
+            self._version += 1
+            return job
+
+    def _done(self, job: _Job) -> None:
+        with self._cond:
+            _, started = self._running.pop(job.execution_id)
+            elapsed = time.monotonic() - started
+            previous = self._durations.get(job.project_id)
+            self._durations[job.project_id] = elapsed if previous is None else (
+                _DURATION_ALPHA * elapsed + (1 - _DURATION_ALPHA) * previous
+            )
+            self._running_per_project[job.project_id] -= 1
+            if not self._running_per_project[job.project_id]:
+                del self._running_per_project[job.project_id]
+            self._version += 1
+            self._cond.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            job = self._take()
+            try:
+                job.run()
+            except Exception as e:
+                print(f"Execution {job.execution_id} failed in scheduler: {e}")
+            finally:
+                self._done(job)
+
+    # ----- estimates -----
+
+    def estimates(self) -> Dict[int, Tuple[int, float]]:
+        """execution id -> (1-based queue position, estimated seconds until it starts) for queued runs.
+
+        Replays the dispatch policy over a copy of the queue, with each run taking its
+        project's average run time, so caps, priorities and fair shares are all accounted for.
+        """
+        with self._cond:
+            version, computed_at, cached = self._estimates
+            if version == self._version and time.monotonic() - computed_at < _ESTIMATE_TTL:
+                return cached
+            now = time.monotonic()
+            queues = {p: {pid: deque(q) for pid, q in projects.items()} for p, projects in self._queues.items()}
+            running = dict(self._running_per_project)
+            # (time the worker frees up, project whose run ends then)
+            events = [
+                (max(self.expected_duration(job.project_id) - (now - started), 0.0), job.project_id)
+                for job, started in self._running.values()
+            ]
+            free = self.workers - len(events)
+            heapq.heapify(events)
+
+            result: Dict[int, Tuple[int, float]] = {}
+            clock = 0.0
+            while True:
+                while free > 0:
+                    picked = self._pick(queues, running)
+                    if not picked:
+                        break
+                    priority, job = picked
+                    queue = queues[priority][job.project_id]
+                    queue.popleft()
+                    if not queue:
+                        del queues[priority][job.project_id]
+                    result[job.execution_id] = (len(result) + 1, round(clock, 1))
+                    running[job.project_id] = running.get(job.project_id, 0) + 1
+                    free -= 1
+                    heapq.heappush(events, (clock + self.expected_duration(job.project_id), job.project_id))
+                if not events or not any(queues[p] for p in PRIORITIES):
+                    break
+                clock, project_id = heapq.heappop(events)
+                running[project_id] -= 1
+                free += 1
+            self._estimates = (self._version, now, result)
+            return result
+
+    def estimate(self, execution_id: int) -> Tuple[Optional[int], Optional[float]]:
+        return self.estimates().get(execution_id, (None, None))
+
+
+scheduler = ExecutionScheduler()
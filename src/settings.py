@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from db import models
+from db.database import SessionLocal
+
+
+# How long a worker trusts its snapshot before re-checking the version row
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "2"))
+
+_lock = threading.Lock()
+_snapshot: Optional[Dict[str, str]] = None
+_version: Optional[int] = None
+_checked_at = 0.0
+
+
+def _current_version(db: Session) -> int:
+    return db.query(models.SettingsVersion.version).filter_by(id=1).scalar() or 0
+
+
+def settings_snapshot(db: Optional[Session] = None) -> Dict[str, str]:
+    """All settings as a dict, reloaded only when the shared version row changes."""
+    global _snapshot, _version, _checked_at
+    if _snapshot is not None and time.monotonic() - _checked_at < SETTINGS_CACHE_TTL:
+        return _snapshot
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < SETTINGS_CACHE_TTL:
+            return _snapshot
+        session = db or SessionLocal()
+        try:
+            version = _current_version(session)
+            if _snapshot is None or version != _version:
+                rows = session.query(models.Settings.key, models.Settings.value).all()
+                _snapshot = {k: v for k, v in rows}
+                _version = version
+            _checked_at = time.monotonic()
+        finally:
+            if db is None:
+                session.close()
+        return _snapshot
+
+
+def invalidate_settings_cache() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def bump_settings_version(db: Session) -> None:
+    """Mark settings as changed for every worker; call inside the writing transaction."""
+    updated = db.query(models.SettingsVersion).filter_by(id=1).update(
+        {models.SettingsVersion.version: models.SettingsVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.add(models.SettingsVersion(id=1, version=1))
+
+
+def get_setting(db: Optional[Session], key: str, default: str = "") -> str:
+    try:
+        value = settings_snapshot(db).get(key)
+        if value:
+            return value
+    except Exception:
+        pass
+    return os.getenv(key, default)
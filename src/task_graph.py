@@ -0,0 +1,26 @@
+"""Ordering rules for task ``async_execution`` and ``context`` in a sequential crew."""
+from typing import List, Tuple
+
+
+def task_links(tasks) -> List[Tuple[bool, List[int]]]:
+    """(async_execution, context as indexes into ``tasks``) for each task, in list order.
+
+    Adjusted to what a sequential CrewAI crew accepts: context only names earlier tasks, an
+    async task never waits on an async task of its own run of consecutive async tasks, and
+    the crew does not end with two async tasks.
+    """
+    index_of = {t.id: i for i, t in enumerate(tasks)}
+    flags = [bool(t.async_execution) for t in tasks]
+    if len(flags) >= 2 and flags[-1] and flags[-2]:
+        flags[-1] = False
+    runs, run = [], 0
+    for i, flag in enumerate(flags):
+        run += 0 if flag and i and flags[i - 1] else 1
+        runs.append(run)
+    links = []
+    for i, t in enumerate(tasks):
+        context = [index_of[c] for c in t.context or [] if index_of.get(c, i) < i]
+        if flags[i]:
+            context = [j for j in context if not (flags[j] and runs[j] == runs[i])]
+        links.append((flags[i], context))
+    return links
@@ -1,4 +1,4 @@
-import os
+from src.settings import get_setting
 
 try:
     from crewai_tools import SerperDevTool, ScrapeWebsiteTool, FileReadTool
@@ -12,7 +12,7 @@ def available_tools(selected: list[str]):
     tools = []
     try:
         if "serper" in selected and SerperDevTool:
-            serper_key = os.getenv("SERPER_API_KEY")
+            serper_key = get_setting(None, "SERPER_API_KEY")
             if serper_key:
                 tools.append(SerperDevTool(api_key=serper_key))
             else:
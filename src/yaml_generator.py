@@ -1,4 +1,4 @@
-import yaml
+from . import yaml_io
 
 def to_yaml_agents(agents):
     data = []
@@ -13,17 +13,23 @@ def to_yaml_agents(agents):
             "memory": a.memory,
             "allow_delegation": a.allow_delegation,
         })
-    return yaml.safe_dump(data, allow_unicode=True, sort_keys=False)
+    return yaml_io.dump(data)
 
 def to_yaml_tasks(tasks, agents_by_id):
+    # context is written as positions in this list, the form the importers read back
+    position = {t.id: i for i, t in enumerate(tasks)}
     data = []
     for t in tasks:
-        data.append({
+        item = {
             "agent": agents_by_id[t.agent_id].name if t.agent_id in agents_by_id else "unknown",
             "description": t.description,
             "expected_output": t.expected_output or "",
             "tools": t.tools or [],
             "async_execution": t.async_execution or False,
             "output_file": t.output_file or "",
-        })
-    return yaml.safe_dump(data, allow_unicode=True, sort_keys=False)
+        }
+        context = [position[c] for c in t.context or [] if c in position]
+        if context:
+            item["context"] = context
+        data.append(item)
+    return yaml_io.dump(data)
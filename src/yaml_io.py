@@ -0,0 +1,30 @@
+"""Safe YAML load/dump through libyaml when PyYAML was built with it.
+
+``yaml.safe_load``/``yaml.safe_dump`` always use the pure-Python parser and emitter; the
+C versions accept and produce the same documents several times faster. Every YAML read
+or write in the project goes through ``load``/``dump`` so the choice is made once here.
+"""
+from typing import Any, Optional
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+    LIBYAML = True
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper, SafeLoader
+    LIBYAML = False
+
+YAMLError = yaml.YAMLError
+
+
+def load(stream) -> Any:
+    """Like ``yaml.safe_load``: str, bytes or a file-like object with ``read``."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump(data: Any, stream=None, **kwargs) -> Optional[str]:
+    """Like ``yaml.safe_dump``, defaulting to unicode output in insertion order."""
+    kwargs.setdefault("allow_unicode", True)
+    kwargs.setdefault("sort_keys", False)
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
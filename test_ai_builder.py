@@ -114,6 +114,30 @@ def test_ai_builder():
     except Exception as e:
         print(f"❌ Erro ao verificar fluxos similares: {e}")
     
+    # 7. Projeto vazio: o fluxo do outro projeto vem em matches, sem found
+    print("\n7️⃣ Verificando fluxos similares a partir de um projeto vazio...")
+    try:
+        response = requests.post(f"{BASE_URL}/projects", json={**project_data, "name": f"Teste AI Builder vazio {int(time.time())}"})
+        response.raise_for_status()
+        empty_id = response.json()["id"]
+        response = requests.get(
+            f"{BASE_URL}/builder/find-similar",
+            params={"project_id": empty_id, "prompt": "análise de sentimentos de comentários"}
+        )
+        response.raise_for_status()
+        result = response.json()
+        other_ids = [m["project_id"] for m in result.get("matches", [])]
+        if not result.get("found") and project_id in other_ids:
+            print(f"✅ found=false e o projeto {project_id} aparece em matches (esperado)")
+        else:
+            print(f"⚠️ Resultado inesperado para o projeto vazio: {result}")
+        response = requests.get(f"{BASE_URL}/projects/{empty_id}/agents")
+        response.raise_for_status()
+        if response.json():
+            print("⚠️ O projeto vazio ganhou agentes sem /builder/generate ou /builder/clone")
+    except Exception as e:
+        print(f"❌ Erro ao verificar o projeto vazio: {e}")
+
     print(f"\n✨ Teste completo! Acesse o editor em: http://localhost:5173/app/editor?projectId={project_id}")
     print("🎯 Use o chat 'Build with AI' para interagir com o fluxo criado!")
 